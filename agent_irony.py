@@ -1,32 +1,63 @@
 import requests
 import urllib3
 import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from ccp_http import PooledSession, get_shared_session
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# GDELT's STARTDATETIME/ENDDATETIME format
+GDELT_DATETIME_FORMAT = "%Y%m%d%H%M%S"
+
+GDELT_DOC_URL = "https://api.gdeltproject.org/api/v2/doc/doc"
+
+# Articles per query by default, and the most GDELT returns for one request.
+DEFAULT_MAX_RECORDS = 5
+MAX_RECORDS = 250
+
 class IronyScout:
-    def __init__(self):
-        self.base_url = "https://api.gdeltproject.org/api/v2/doc/doc"
+    def __init__(self, session: Optional[PooledSession] = None, base_url: Optional[str] = None):
+        # CCP_GDELT_URL points the scout at a stand-in API (see benchmarks/)
+        self.base_url = base_url or os.environ.get("CCP_GDELT_URL", GDELT_DOC_URL)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        # Shared keep-alive pool; it also spaces requests to GDELT's cadence
+        self.session = session or get_shared_session()
 
-    def fetch_irony(self, query_term, theme_name):
+    def fetch_irony(
+        self,
+        query_term,
+        theme_name,
+        start_datetime: Optional[datetime] = None,
+        raise_errors=False,
+        max_records: int = DEFAULT_MAX_RECORDS,
+    ):
         params = {
             "query": f"{query_term} sourcelang:eng",
             "mode": "artlist",
-            "maxrecords": "5",
+            "maxrecords": str(max(1, min(max_records, MAX_RECORDS))),
             "timespan": "7d", 
             "format": "json",
             "sort": "toneasc" # Still asking for the "worst" news first
         }
+        if start_datetime is not None:
+            # Incremental run: only ask for what was published since the last one
+            del params["timespan"]
+            params["startdatetime"] = start_datetime.strftime(GDELT_DATETIME_FORMAT)
+            params["enddatetime"] = datetime.utcnow().strftime(GDELT_DATETIME_FORMAT)
 
         try:
-            response = requests.get(self.base_url, params=params, headers=self.headers, verify=False, timeout=15)
+            response = self.session.get(self.base_url, params=params, headers=self.headers, verify=False, timeout=15)
             response.raise_for_status()
             data = response.json()
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"❌ Error for {theme_name}: {e}")
             return []
 
@@ -46,7 +77,8 @@ class IronyScout:
                 "Tone_Score": tone, 
                 "Source": art.get("source name", "Unknown"),
                 "URL": art.get("url"),
-                "Date": art.get("seendate", "")[:8] 
+                "Date": art.get("seendate", "")[:8],
+                "Seen_At": art.get("seendate", "")
             })
 
         return clean_results
@@ -1,16 +1,32 @@
 import requests
 import datetime
+import os
 import urllib3
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
+
+from ccp_http import PooledSession, get_shared_session
 
 # Disable warnings just in case, though pip-system-certs usually handles it
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# OpenAlex refuses per_page values above this.
+MAX_PER_PAGE = 200
+
+OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+
 class ScienceScout:
-    def __init__(self, email="your_email@example.com"):
-        self.base_url = "https://api.openalex.org/works"
+    def __init__(
+        self,
+        email="your_email@example.com",
+        session: Optional[PooledSession] = None,
+        base_url: Optional[str] = None,
+    ):
+        # CCP_OPENALEX_URL points the scout at a stand-in API (see benchmarks/)
+        self.base_url = base_url or os.environ.get("CCP_OPENALEX_URL", OPENALEX_WORKS_URL)
         # Identify yourself to get faster/better pool access
         self.headers = {"User-Agent": f"mailto:{email}"}
+        # Shared keep-alive pool with retry/backoff; see ccp_http
+        self.session = session or get_shared_session()
 
     def reconstruct_abstract(self, inverted_index: Dict) -> str:
         """
@@ -18,70 +34,125 @@ class ScienceScout:
         """
         if not inverted_index:
             return "No abstract available."
-        
-        word_list = []
+
+        # Positions are word offsets, so each word drops straight into its
+        # slot; no need to sort (pos, word) pairs.
+        length = 1 + max(map(max, filter(None, inverted_index.values())), default=-1)
+        words = [""] * length
         for word, positions in inverted_index.items():
             for pos in positions:
-                word_list.append((pos, word))
+                words[pos] = word
+        # Gaps in the positions leave empty slots; skip them rather than
+        # joining them into double spaces.
+        return " ".join(filter(None, words))
+
+    def _build_params(
+        self,
+        query: str,
+        days_back: int,
+        per_page: int,
+        from_date: Optional[datetime.date] = None,
+    ) -> Dict:
+        # An explicit from_date (an incremental run's delta window) wins over days_back
+        start_date = from_date or datetime.date.today() - datetime.timedelta(days=days_back)
+
+        return {
+            "filter": f"default.search:{query},from_publication_date:{start_date}",
+            "sort": "cited_by_count:desc,relevance_score:desc",
+            "per_page": per_page,
+            "select": "id,title,publication_date,primary_location,open_access,abstract_inverted_index,concepts,cited_by_count"
+        }
+
+    def _clean_work(self, work: Dict) -> Dict:
+        # --- DEFENSIVE CODING FIX ---
+        # 1. Get primary_location, default to empty dict if None
+        primary_loc = work.get('primary_location') or {}
         
-        sorted_words = sorted(word_list, key=lambda x: x[0])
-        return " ".join([word for _, word in sorted_words])
+        # 2. Get source, default to empty dict if None (The previous crash point)
+        source = primary_loc.get('source') or {}
+        
+        # 3. Get display_name safely
+        source_name = source.get('display_name', 'Unknown Source')
+        # -----------------------------
 
-    def fetch_papers(self, query: str, days_back: int = 60) -> List[Dict]:
-        today = datetime.date.today()
-        start_date = today - datetime.timedelta(days=days_back)
+        inverted_index = work.get('abstract_inverted_index')
+        abstract_text = self.reconstruct_abstract(inverted_index)
         
-        # API Parameters
-        params = {
-            "filter": f"default.search:{query},from_publication_date:{start_date}",
-            "sort": "cited_by_count:desc,relevance_score:desc",
-            "per_page": 5,
-            "select": "id,title,publication_date,primary_location,open_access,abstract_inverted_index,concepts"
+        # Handle Concepts safely
+        concepts = work.get('concepts', []) or []
+        top_concepts = [c.get('display_name') for c in concepts[:3]]
+
+        # Handle URL safely
+        open_access = work.get('open_access') or {}
+        url = open_access.get('oa_url') or primary_loc.get('landing_page_url') or "No URL"
+
+        return {
+            "Headline": work.get('title', 'No Title'),
+            "Journal": source_name,
+            "Date": work.get('publication_date', 'Unknown Date'),
+            "Abstract_Snippet": abstract_text[:300] + "..." if len(abstract_text) > 300 else abstract_text,
+            # Full text for storage; None when OpenAlex has no abstract.
+            "Abstract": abstract_text if inverted_index else None,
+            "URL": url,
+            "Key_Topics": top_concepts,
+            "Citations": work.get('cited_by_count')
         }
 
+    def fetch_papers(
+        self,
+        query: str,
+        days_back: int = 60,
+        from_date: Optional[datetime.date] = None,
+    ) -> List[Dict]:
+        # API Parameters
+        params = self._build_params(query, days_back, per_page=5, from_date=from_date)
+
         try:
             # Added timeout to prevent hanging
-            response = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(self.base_url, params=params, headers=self.headers, timeout=10)
             response.raise_for_status() # Check for HTTP errors
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {e}")
             return []
 
         results = response.json().get('results', [])
-        clean_results = []
-
-        for work in results:
-            # --- DEFENSIVE CODING FIX ---
-            # 1. Get primary_location, default to empty dict if None
-            primary_loc = work.get('primary_location') or {}
-            
-            # 2. Get source, default to empty dict if None (The previous crash point)
-            source = primary_loc.get('source') or {}
-            
-            # 3. Get display_name safely
-            source_name = source.get('display_name', 'Unknown Source')
-            # -----------------------------
-
-            abstract_text = self.reconstruct_abstract(work.get('abstract_inverted_index'))
-            
-            # Handle Concepts safely
-            concepts = work.get('concepts', []) or []
-            top_concepts = [c.get('display_name') for c in concepts[:3]]
-
-            # Handle URL safely
-            open_access = work.get('open_access') or {}
-            url = open_access.get('oa_url') or primary_loc.get('landing_page_url') or "No URL"
-
-            clean_results.append({
-                "Headline": work.get('title', 'No Title'),
-                "Journal": source_name,
-                "Date": work.get('publication_date', 'Unknown Date'),
-                "Abstract_Snippet": abstract_text[:300] + "..." if len(abstract_text) > 300 else abstract_text,
-                "URL": url,
-                "Key_Topics": top_concepts
-            })
-
-        return clean_results
+        return [self._clean_work(work) for work in results]
+
+    def iter_papers(
+        self,
+        query: str,
+        days_back: int = 60,
+        per_page: int = MAX_PER_PAGE,
+        max_results: Optional[int] = None,
+        from_date: Optional[datetime.date] = None,
+    ) -> Iterator[Dict]:
+        """
+        Walks OpenAlex cursor pages lazily, yielding cleaned papers one at a time.
+        Only one page is held in memory. Unlike fetch_papers, request errors are
+        raised so the caller can tell a failed backfill from an empty one.
+        """
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+        if max_results is not None:
+            per_page = min(per_page, max_results)
+        params = self._build_params(query, days_back, per_page=per_page, from_date=from_date)
+        params["cursor"] = "*"
+
+        yielded = 0
+        while params["cursor"]:
+            response = self.session.get(self.base_url, params=params, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            payload = response.json()
+            results = payload.get('results') or []
+
+            for work in results:
+                yield self._clean_work(work)
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+
+            if not results:
+                return
+            params["cursor"] = (payload.get('meta') or {}).get('next_cursor')
 
 # --- EXECUTION BLOCK ---
 
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark for the feed page renderer.
+
+Compares the original per-request f-string renderer with ccp_render, both
+with a cold fragment cache (first request after start-up) and a warm one
+(every later request until new items arrive).
+
+    python benchmarks/bench_render.py --sizes 200 2000 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ccp_render import STYLE, SCRIPT, FragmentCache, render_page  # noqa: E402
+
+
+def make_items(count: int) -> List[Dict]:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": f"item-{index:08d}",
+            "item_type": "science" if index % 2 else "society",
+            "topic": f"Topic {index % 12}",
+            "headline": f"Synthetic headline number {index} about <mitochondria> & sleep",
+            "source": f"Journal {index % 40}",
+            "published_date": (start + timedelta(days=index % 365)).date().isoformat(),
+            "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 5,
+            "url": f"https://example.org/works/{index}",
+            "tone": None if index % 2 else -3.25,
+            "created_at": (start + timedelta(minutes=index)).isoformat(),
+        }
+        for index in range(count)
+    ]
+
+
+def legacy_render_page(items: List[Dict], now: str) -> str:
+    """The renderer ccp_server used before ccp_render: everything rebuilt per request, unescaped."""
+    rows = []
+    for item in items:
+        summary = item.get("summary") or ""
+        tone = item.get("tone")
+        tone_display = f"{tone:.2f}" if isinstance(tone, (float, int)) else ""
+        rows.append(
+            f"""
+                    <div class="item">
+                      <div class="meta">
+                        <span class="badge">{item['item_type'].upper()}</span>
+                        <span class="topic">{item['topic']}</span>
+                        <span class="source">{item['source']}</span>
+                        <span class="date">{item.get('published_date') or ""}</span>
+                      </div>
+                      <h3>{item['headline']}</h3>
+                      <p class="summary">{summary}</p>
+                      <div class="links">
+                        <a href="{item.get('url') or '#'}" target="_blank" rel="noreferrer">Open source</a>
+                        <button class="copy" data-copy="{item['headline']} — {summary} {item.get('url') or ''}">Copy</button>
+                        <span class="tone">{tone_display}</span>
+                      </div>
+                    </div>
+                    """
+        )
+    return f"""
+            <!doctype html>
+            <html lang="en">
+              <head>
+                <title>Conscious Curation Pipeline</title>
+                <style>{STYLE}</style>
+              </head>
+              <body>
+                <header><h1>Conscious Curation Pipeline</h1><p>Updated {now}</p></header>
+                <main>
+                  {''.join(rows) if rows else "<p>No items yet. Run the ingest job.</p>"}
+                </main>
+                <script>{SCRIPT}</script>
+              </body>
+            </html>
+            """
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict]:
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    results = []
+    for size in sizes:
+        items = make_items(size)
+        legacy = best_of(repeat, lambda: legacy_render_page(items, now))
+        # A fresh cache per run, so every run is a cold render.
+        cold = best_of(repeat, lambda: render_page(items, now, cache=FragmentCache(size)))
+        cache = FragmentCache(size)
+        render_page(items, now, cache=cache)
+        warm = best_of(repeat, lambda: render_page(items, now, cache=cache))
+        results.append(
+            {
+                "items": size,
+                "legacy_ms": round(legacy * 1000, 3),
+                "cold_ms": round(cold * 1000, 3),
+                "warm_ms": round(warm * 1000, 3),
+                "warm_speedup": round(legacy / warm, 2) if warm else None,
+            }
+        )
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark feed page rendering.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000], help="Item counts to render.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'items':>8} {'legacy ms':>10} {'cold ms':>10} {'warm ms':>10} {'speedup':>8}")
+        for row in results:
+            print(
+                f"{row['items']:>8} {row['legacy_ms']:>10.2f} {row['cold_ms']:>10.2f} "
+                f"{row['warm_ms']:>10.2f} {row['warm_speedup']:>7.1f}x"
+            )
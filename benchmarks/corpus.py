@@ -0,0 +1,118 @@
+"""
+Deterministic synthetic data for the benchmarks: CCP items, OpenAlex works
+and GDELT articles that look enough like the real thing to exercise the same
+code paths (abstract reconstruction, near-duplicate clustering, FTS).
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ccp_storage import get_write_connection, init_db, save_items  # noqa: E402
+
+VOCABULARY = """
+mitochondria sleep circadian neuron plant signaling root fungal network quantum
+coherence photosynthesis enzyme tunnelling magnetoreception cryptochrome bird
+migration memory synapse glia metabolism stress resilience forest soil microbiome
+budget overrun delay infrastructure audit artificial intelligence model error
+risk automation chatbot climate emissions drought flood policy subsidy grid
+battery recycling waste lawsuit regulator hospital vaccine trial outcome
+""".split()
+TOPICS = [
+    "Mechanics of Consciousness",
+    "Ecological Intelligence",
+    "Quantum Bridges",
+    "The Tech Trap",
+    "The Expensive Failure",
+    "The Green Dilemma",
+]
+OUTLETS = ["Reuters", "AP News", "BBC News", "The Guardian", "Bloomberg", "Al Jazeera"]
+START = datetime(2024, 1, 1)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def make_items(count: int, seed: int = 0, duplicate_rate: float = 0.1) -> Iterator[Dict]:
+    """
+    count items, newest last. About duplicate_rate of them re-run an earlier
+    headline with an outlet suffix, like syndicated news does.
+    """
+    rng = random.Random(seed)
+    recent: List[str] = []
+    for index in range(count):
+        science = index % 2 == 0
+        if recent and rng.random() < duplicate_rate:
+            headline = f"{rng.choice(recent)} - {rng.choice(OUTLETS)}"
+        else:
+            headline = _sentence(rng, rng.randint(6, 12)).capitalize()
+            recent = (recent + [headline])[-50:]
+        summary = _sentence(rng, 45) if science else None
+        yield {
+            "id": f"bench-{seed}-{index:09d}",
+            "item_type": "science" if science else "society",
+            "topic": TOPICS[(index % 3) + (0 if science else 3)],
+            "headline": headline,
+            "source": f"Journal {index % 40}" if science else rng.choice(OUTLETS),
+            "published_date": (START + timedelta(days=index % 365)).date().isoformat(),
+            "summary": summary,
+            "body": f"{summary} {_sentence(rng, 150)}" if science else None,
+            "url": f"https://example.org/items/{index}",
+            "tone": None if science else round(rng.uniform(-10, 5), 2),
+            "citations": index * 37 % 500 if science else None,
+            "created_at": (START + timedelta(seconds=index * 30)).isoformat(),
+        }
+
+
+def make_work(index: int, rng: random.Random) -> Dict:
+    """One OpenAlex /works result, abstract as an inverted index."""
+    inverted: Dict[str, List[int]] = {}
+    for position in range(rng.randint(120, 260)):
+        inverted.setdefault(rng.choice(VOCABULARY), []).append(position)
+    return {
+        "id": f"https://openalex.org/W{index}",
+        "title": _sentence(rng, rng.randint(6, 14)).capitalize(),
+        "publication_date": (START + timedelta(days=index % 365)).date().isoformat(),
+        "primary_location": {
+            "source": {"display_name": f"Journal {index % 40}"},
+            "landing_page_url": f"https://doi.org/10.0000/{index}",
+        },
+        "open_access": {"oa_url": None},
+        "abstract_inverted_index": inverted,
+        "concepts": [{"display_name": word} for word in rng.sample(VOCABULARY, 3)],
+        "cited_by_count": index * 37 % 500,
+    }
+
+
+def make_article(index: int, rng: random.Random) -> Dict:
+    """One GDELT doc-API artlist entry."""
+    seen = START + timedelta(minutes=15 * index)
+    return {
+        "url": f"https://news.example.com/{index}",
+        "title": _sentence(rng, rng.randint(6, 12)).capitalize(),
+        "seendate": seen.strftime("%Y%m%dT%H%M%SZ"),
+        "domain": "news.example.com",
+        "source name": rng.choice(OUTLETS),
+        "avgtone": str(round(rng.uniform(-10, 5), 3)),
+    }
+
+
+def build_database(db_path: str, count: int, seed: int = 0, batch_size: int = 5000) -> None:
+    """Create db_path holding count synthetic items, written through save_items."""
+    init_db(db_path)
+    conn = get_write_connection(db_path)
+    try:
+        batch: List[Dict] = []
+        for item in make_items(count, seed=seed):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                save_items(batch, conn=conn)
+                batch = []
+        if batch:
+            save_items(batch, conn=conn)
+    finally:
+        conn.close()
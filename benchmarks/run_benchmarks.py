@@ -0,0 +1,341 @@
+"""
+End-to-end benchmarks against local stand-in APIs and synthetic databases.
+
+Measures ingest throughput (scouts -> stub APIs -> SQLite), save_items
+rows/sec, list_items/search latency at several table sizes, and ccp_server
+latency percentiles under concurrent keep-alive clients. Results are written
+as JSON so runs can be compared across commits:
+
+    python benchmarks/run_benchmarks.py --output bench-results.json
+    python benchmarks/run_benchmarks.py --quick
+
+Synthetic databases are kept in --work-dir and reused by later runs; the
+1M-row one takes several minutes to build the first time.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing, redirect_stdout
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import ccp_ingest  # noqa: E402
+from ccp_http import configure_shared_session  # noqa: E402
+from ccp_storage import (  # noqa: E402
+    ReadConnectionManager,
+    encode_cursor,
+    init_db,
+    list_items,
+    save_items,
+    search_items,
+)
+from corpus import TOPICS, build_database, make_items  # noqa: E402
+from stub_apis import GDELT_PATH, WORKS_PATH, StubAPIServer  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+QUICK_SIZES = [10_000]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(max(samples, default=0.0) * 1000, 3),
+    }
+
+
+def timed(repeat: int, func: Callable[[], object]) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def bench_ingest(
+    work_dir: str,
+    latency: float,
+    error_rate: float,
+    works_per_query: int,
+    concurrency: int,
+) -> Dict:
+    db_path = os.path.join(work_dir, "ingest.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    stub = StubAPIServer(latency=latency, error_rate=error_rate, works_per_query=works_per_query).start()
+    os.environ["CCP_OPENALEX_URL"] = stub.base_url + WORKS_PATH
+    os.environ["CCP_GDELT_URL"] = stub.base_url + GDELT_PATH
+    # A fresh session per run so the HTTP counters only cover this run.
+    session = configure_shared_session()
+    try:
+        started = time.perf_counter()
+        # Ingest reports progress on stdout, which may be carrying the JSON results.
+        with redirect_stdout(sys.stderr):
+            inserted = ccp_ingest.ingest(db_path, 120, concurrency=concurrency, science_max_results=None)
+        elapsed = time.perf_counter() - started
+    finally:
+        stub.stop()
+    return {
+        "concurrency": concurrency,
+        "latency_ms": latency * 1000,
+        "error_rate": error_rate,
+        "items": inserted,
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(inserted / elapsed, 1) if elapsed else None,
+        "stub_requests": stub.stats["requests"],
+        "stub_errors": stub.stats["errors"],
+        "http": session.stats(),
+    }
+
+
+def bench_save_items(work_dir: str, count: int, batch_size: int) -> Dict:
+    db_path = os.path.join(work_dir, "save.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    items = list(make_items(count, seed=1))
+    init_db(db_path)
+    started = time.perf_counter()
+    inserted = save_items(items, db_path=db_path, batch_size=batch_size)
+    insert_seconds = time.perf_counter() - started
+    # Same items again: the steady state of an overlapping incremental ingest.
+    started = time.perf_counter()
+    save_items(items, db_path=db_path, batch_size=batch_size)
+    duplicate_seconds = time.perf_counter() - started
+    return {
+        "rows": count,
+        "inserted": inserted,
+        "insert_rows_per_sec": round(count / insert_seconds, 1),
+        "duplicate_rows_per_sec": round(count / duplicate_seconds, 1),
+    }
+
+
+def ensure_database(work_dir: str, size: int) -> str:
+    db_path = os.path.join(work_dir, f"items-{size}.db")
+    if os.path.exists(db_path):
+        with closing(sqlite3.connect(db_path)) as conn:
+            try:
+                if conn.execute("SELECT count(*) FROM items").fetchone()[0] == size:
+                    return db_path
+            except sqlite3.DatabaseError:
+                pass
+        os.remove(db_path)
+    print(f"  building {size:,}-row database ...", file=sys.stderr)
+    build_database(db_path, size)
+    return db_path
+
+
+def bench_list_items(db_path: str, size: int, repeat: int) -> Dict:
+    manager = ReadConnectionManager(db_path)
+    conn = manager.get()
+    try:
+        middle = conn.execute(
+            "SELECT created_at, id FROM items ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+            (size // 2,),
+        ).fetchone()
+        middle_cursor = encode_cursor({"created_at": middle[0], "id": middle[1]})
+        cases = {
+            "first_page": lambda: list_items(limit=100, conn=conn),
+            "type_filter": lambda: list_items(limit=100, item_type="science", conn=conn),
+            "topic_filter": lambda: list_items(limit=100, topic=TOPICS[1], conn=conn),
+            "deep_cursor": lambda: list_items(limit=100, cursor=middle_cursor, conn=conn),
+            "collapsed": lambda: list_items(limit=100, collapse=True, conn=conn),
+            "search": lambda: search_items("mitochondria sleep", limit=50, conn=conn),
+        }
+        results = {"rows": size}
+        for name, case in cases.items():
+            case()  # warm the page cache
+            results[name] = summarize_ms(timed(repeat, case))
+        return results
+    finally:
+        manager.close_all()
+
+
+def _free_port() -> int:
+    with closing(socket.socket()) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"ccp_server did not start on port {port}")
+
+
+def bench_server(
+    db_path: str,
+    workers: int,
+    clients: int,
+    requests_per_client: int,
+    cache_entries: int,
+) -> Dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(REPO_DIR, "ccp_server.py"),
+            "--db-path", db_path,
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--max-connections", str(max(clients * 2, 64)),
+            "--cache-entries", str(cache_entries),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    paths = ["/", "/api/items?limit=50", "/api/search?q=quantum", "/?type=science"]
+    paths += [f"/api/items?limit=50&topic={topic.replace(' ', '+')}" for topic in TOPICS]
+    samples: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(offset: int) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local: List[float] = []
+        for index in range(requests_per_client):
+            path = paths[(offset + index) % len(paths)]
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            samples.extend(local)
+
+    try:
+        _wait_for_port(port)
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "workers": workers,
+        "clients": clients,
+        "cache_entries": cache_entries,
+        "requests": len(samples),
+        "errors": errors[0],
+        "requests_per_sec": round(len(samples) / elapsed, 1) if elapsed else None,
+        **summarize_ms(samples),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict:
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="ccp-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    results: Dict = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+    print("ingest ...", file=sys.stderr)
+    results["ingest"] = [
+        bench_ingest(work_dir, args.latency_ms / 1000, args.error_rate, args.works_per_query, concurrency)
+        for concurrency in (1, 4)
+    ]
+
+    print("save_items ...", file=sys.stderr)
+    results["save_items"] = bench_save_items(work_dir, 2_000 if args.quick else args.save_rows, args.batch_size)
+
+    print("list_items ...", file=sys.stderr)
+    results["list_items"] = [
+        bench_list_items(ensure_database(work_dir, size), size, args.repeat) for size in sizes
+    ]
+
+    print("server ...", file=sys.stderr)
+    server_db = ensure_database(work_dir, sizes[-1] if args.quick else min(sizes[-1], 100_000))
+    results["server"] = [
+        bench_server(server_db, args.workers, args.clients, args.requests, cache_entries)
+        for cache_entries in (256, 0)
+    ]
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the CCP benchmark suite and write JSON results.")
+    parser.add_argument("--output", help="Write results here (default: stdout).")
+    parser.add_argument("--work-dir", help="Where synthetic databases are built and kept between runs.")
+    parser.add_argument("--quick", action="store_true", help="Small sizes only; for smoke-testing the suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Table sizes for list_items.")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per list_items case.")
+    parser.add_argument("--save-rows", type=int, default=20_000, help="Rows written in the save_items benchmark.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="save_items batch size.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub API latency per request.")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of stub API requests that fail.")
+    parser.add_argument("--works-per-query", type=int, default=1000, help="OpenAlex results per stub query.")
+    parser.add_argument("--workers", type=int, default=8, help="ccp_server worker threads.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent keep-alive clients.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
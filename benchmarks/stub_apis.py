@@ -0,0 +1,145 @@
+"""
+Local stand-ins for the OpenAlex /works and GDELT doc APIs.
+
+Responses follow the real shapes closely enough for the scouts (cursor
+paging, inverted-index abstracts, artlist JSON). Every request can be delayed
+and a fraction of them fail with 429/503 to exercise retries. Point the
+scouts here with CCP_OPENALEX_URL / CCP_GDELT_URL or their base_url argument.
+
+    python benchmarks/stub_apis.py --port 8099 --latency-ms 50 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from corpus import make_article, make_work
+
+WORKS_PATH = "/works"
+GDELT_PATH = "/api/v2/doc/doc"
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubAPIServer"
+
+    def do_GET(self):  # noqa: N802
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        self.server.count("requests")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.should_fail():
+            self.server.count("errors")
+            status = random.choice((429, 503))
+            self._send(status, {"error": "stub failure"}, {"Retry-After": "0"})
+            return
+        if url.path == WORKS_PATH:
+            self._send(200, self.server.works_page(query))
+        elif url.path == GDELT_PATH:
+            self._send(200, self.server.articles(query))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        works_per_query: int = 1000,
+        seed: int = 0,
+    ) -> None:
+        super().__init__((host, port), StubAPIHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.works_per_query = works_per_query
+        self.seed = seed
+        self.stats = {"requests": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def works_page(self, query: Dict[str, str]) -> Dict:
+        per_page = int(query.get("per_page", 25))
+        cursor = query.get("cursor", "*")
+        offset = 0 if cursor == "*" else int(cursor)
+        end = min(offset + per_page, self.works_per_query)
+        # Seeded by query and offset, so a page always has the same content.
+        rng = random.Random(f"{self.seed}:{query.get('filter')}:{offset}")
+        base = zlib.crc32(query.get("filter", "").encode()) % 10_000_000
+        results = [make_work(base + index, rng) for index in range(offset, end)]
+        next_cursor = str(end) if end < self.works_per_query else None
+        return {"meta": {"count": self.works_per_query, "next_cursor": next_cursor}, "results": results}
+
+    def articles(self, query: Dict[str, str]) -> Dict:
+        count = int(query.get("maxrecords", 75))
+        rng = random.Random(f"{self.seed}:{query.get('query')}")
+        base = zlib.crc32(query.get("query", "").encode()) % 10_000_000
+        return {"articles": [make_article(base + index, rng) for index in range(count)]}
+
+    def start(self) -> "StubAPIServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve stand-in OpenAlex and GDELT APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 429/503.")
+    parser.add_argument("--works-per-query", type=int, default=1000, help="OpenAlex results behind each query.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    server = StubAPIServer(
+        args.host,
+        args.port,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        works_per_query=args.works_per_query,
+    )
+    print(f"OpenAlex stand-in: {server.base_url}{WORKS_PATH}")
+    print(f"GDELT stand-in:    {server.base_url}{GDELT_PATH}")
+    server.serve_forever()
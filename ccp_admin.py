@@ -0,0 +1,153 @@
+import argparse
+from typing import Tuple
+
+from ccp_archive import DEFAULT_ARCHIVE_DIR, DEFAULT_RETENTION_DAYS, archive_items, restore_archive
+from ccp_storage import (
+    DEFAULT_DB_PATH,
+    SpaceReport,
+    compact_db,
+    rebuild_clusters,
+    rebuild_search_index,
+    rebuild_summaries,
+    space_report,
+)
+
+# Tables and indexes listed by the space command.
+SPACE_REPORT_TABLES = 10
+
+
+def _rebuild_fts(args: argparse.Namespace) -> None:
+    indexed = rebuild_search_index(args.db_path)
+    print(f"Rebuilt full-text index for {indexed} items in {args.db_path}")
+
+
+def _rebuild_clusters(args: argparse.Namespace) -> None:
+    clusters = rebuild_clusters(args.db_path)
+    print(f"Rebuilt near-duplicate index: {clusters} clusters in {args.db_path}")
+
+
+def _rebuild_summaries(args: argparse.Namespace) -> None:
+    facet_values, topics = rebuild_summaries(args.db_path)
+    print(f"Rebuilt summaries: {facet_values} facet values, top items for {topics} topics in {args.db_path}")
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 1_000_000:.1f} MB"
+
+
+def _print_space(report: SpaceReport) -> None:
+    print(
+        f"  database {_megabytes(report.db_bytes)}, WAL {_megabytes(report.wal_bytes)}, "
+        f"{report.free_pages} free pages ({_megabytes(report.free_pages * report.page_size)})"
+    )
+    for name, size in list(report.tables.items())[:SPACE_REPORT_TABLES]:
+        print(f"  {name:<32} {_megabytes(size):>10}")
+
+
+def _print_compaction(db_path: str, before: SpaceReport, after: SpaceReport) -> None:
+    print(
+        f"Compacted {db_path}: {_megabytes(before.total_bytes)} -> {_megabytes(after.total_bytes)} "
+        f"({_megabytes(before.total_bytes - after.total_bytes)} reclaimed)"
+    )
+
+
+def _retention(value: str) -> Tuple[str, int]:
+    item_type, _, days = value.partition("=")
+    if item_type not in DEFAULT_RETENTION_DAYS or not days.isdigit():
+        raise argparse.ArgumentTypeError(
+            f"expected one of {', '.join(DEFAULT_RETENTION_DAYS)} as TYPE=DAYS, got {value!r}"
+        )
+    return item_type, int(days)
+
+
+def _archive(args: argparse.Namespace) -> None:
+    retention = {**DEFAULT_RETENTION_DAYS, **dict(args.keep or [])}
+    archived = archive_items(args.db_path, args.archive_dir, retention, dry_run=args.dry_run)
+    policy = ", ".join(f"{item_type} after {days} days" for item_type, days in retention.items())
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"{verb} {sum(archived.values())} items ({policy}) to {args.archive_dir}")
+    for month, count in sorted(archived.items()):
+        print(f"  {month}: {count}")
+    if not args.dry_run and not args.no_compact:
+        _print_compaction(args.db_path, *compact_db(args.db_path))
+
+
+def _compact(args: argparse.Namespace) -> None:
+    before, after = compact_db(args.db_path, full=args.full)
+    _print_compaction(args.db_path, before, after)
+    _print_space(after)
+
+
+def _space(args: argparse.Namespace) -> None:
+    print(f"Space used by {args.db_path}:")
+    _print_space(space_report(args.db_path))
+
+
+def _restore(args: argparse.Namespace) -> None:
+    restored = restore_archive(args.archive, args.db_path)
+    print(f"Restored {restored} items from {args.archive} into {args.db_path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Maintenance commands for the CCP database.")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH, help="Path to the SQLite database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_fts_parser = commands.add_parser(
+        "rebuild-fts",
+        help="Repopulate the full-text search index from the items table.",
+    )
+    rebuild_fts_parser.set_defaults(handler=_rebuild_fts)
+
+    rebuild_clusters_parser = commands.add_parser(
+        "rebuild-clusters",
+        help="Recompute near-duplicate clusters for every item.",
+    )
+    rebuild_clusters_parser.set_defaults(handler=_rebuild_clusters)
+
+    rebuild_summaries_parser = commands.add_parser(
+        "rebuild-summaries",
+        help="Recompute the facet counts and per-topic top items from the items table.",
+    )
+    rebuild_summaries_parser.set_defaults(handler=_rebuild_summaries)
+
+    archive_parser = commands.add_parser(
+        "archive",
+        help="Move items past their retention into monthly JSONL.gz archives, then compact.",
+    )
+    archive_parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="Directory for the archive files.")
+    archive_parser.add_argument(
+        "--keep",
+        action="append",
+        type=_retention,
+        metavar="TYPE=DAYS",
+        help="Days to keep each item type after ingest, e.g. society=30. May be repeated. "
+        f"Defaults: {', '.join(f'{key}={value}' for key, value in DEFAULT_RETENTION_DAYS.items())}.",
+    )
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+    archive_parser.add_argument("--no-compact", action="store_true", help="Skip the vacuum and WAL checkpoint.")
+    archive_parser.set_defaults(handler=_archive)
+
+    compact_parser = commands.add_parser(
+        "compact",
+        help="Return free pages to the filesystem and truncate the WAL.",
+    )
+    compact_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Run a full VACUUM (rewrites the file) instead of an incremental one.",
+    )
+    compact_parser.set_defaults(handler=_compact)
+
+    space_parser = commands.add_parser("space", help="Report file, WAL and per-table sizes.")
+    space_parser.set_defaults(handler=_space)
+
+    restore_parser = commands.add_parser("restore", help="Load an archive file back into the database.")
+    restore_parser.add_argument("archive", help="Archive file written by the archive command.")
+    restore_parser.set_defaults(handler=_restore)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.handler(args)
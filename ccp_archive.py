@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+from collections import Counter
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from ccp_storage import (
+    ITEM_COLUMNS,
+    delete_items,
+    get_bodies,
+    get_connection,
+    get_write_connection,
+    init_db,
+    iter_item_rows,
+    list_items,
+    save_items,
+)
+
+DEFAULT_ARCHIVE_DIR = os.environ.get("CCP_ARCHIVE_DIR", "archive")
+# Days an item stays in the database after it was ingested, by item_type.
+# Both are well past the dossier's windows (120 and 7 days).
+DEFAULT_RETENTION_DAYS = {"science": 730, "society": 90}
+# Items archived and deleted per transaction.
+ARCHIVE_BATCH_SIZE = 1000
+
+_CREATED_INDEX = ITEM_COLUMNS.index("created_at")
+
+
+def archive_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"items-{month}.jsonl.gz")
+
+
+def retention_cutoffs(
+    retention_days: Optional[Dict[str, int]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, str]:
+    """created_at before which each item_type is archived."""
+    days = {**DEFAULT_RETENTION_DAYS, **(retention_days or {})}
+    now = now or datetime.utcnow()
+    return {item_type: (now - timedelta(days=keep)).isoformat() for item_type, keep in days.items()}
+
+
+def _append(path: str, items: List[Dict[str, Any]]) -> None:
+    lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+    # Each call adds one gzip member; gzip readers treat the file as one stream.
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            archive.write(lines.encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_items(
+    db_path: Optional[str] = None,
+    archive_dir: str = DEFAULT_ARCHIVE_DIR,
+    retention_days: Optional[Dict[str, int]] = None,
+    now: Optional[datetime] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Counter:
+    """
+    Move items ingested longer ago than their type's retention into monthly
+    archives (archive_dir/items-YYYY-MM.jsonl.gz, by created_at) and delete
+    them from the database. Returns the number of items per month.
+
+    Every batch is on disk before it is deleted, so a crash can at worst
+    archive a batch twice. Lines are items as save_items takes them, body
+    included (see restore_archive). dry_run only counts.
+    """
+    init_db(db_path)
+    archived: Counter = Counter()
+    cutoffs = retention_cutoffs(retention_days, now)
+    with closing(get_connection(db_path)) as read_conn:
+        if dry_run:
+            for item_type, cutoff in cutoffs.items():
+                for row in iter_item_rows(read_conn, item_type=item_type, until=cutoff):
+                    archived[row[_CREATED_INDEX][:7]] += 1
+            return archived
+        os.makedirs(archive_dir, exist_ok=True)
+        with closing(get_write_connection(db_path)) as write_conn:
+            for item_type, cutoff in cutoffs.items():
+                while True:
+                    items = list_items(limit=batch_size, item_type=item_type, until=cutoff, conn=read_conn)
+                    if not items:
+                        break
+                    bodies = get_bodies([item["id"] for item in items], read_conn)
+                    months: Dict[str, List[Dict[str, Any]]] = {}
+                    for item in items:
+                        item["body"] = bodies.get(item["id"])
+                        months.setdefault(item["created_at"][:7], []).append(item)
+                    for month, batch in sorted(months.items()):
+                        _append(archive_path(archive_dir, month), batch)
+                        archived[month] += len(batch)
+                    delete_items([item["id"] for item in items], conn=write_conn)
+    return archived
+
+
+def read_archive(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_archive(path: str, db_path: Optional[str] = None) -> int:
+    """
+    Load an archive file back into the database and return the rows added;
+    items still in the database are left alone. Restored items keep their
+    created_at, so the next archive run moves them out again unless the
+    retention for their type has been raised.
+    """
+    init_db(db_path)
+    return save_items(read_archive(path), db_path=db_path)
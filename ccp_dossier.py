@@ -0,0 +1,189 @@
+import html
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from ccp_queries import Registry
+from ccp_render import STYLE
+from ccp_storage import get_connection, top_items
+
+FORMATS = ("text", "md", "html")
+# Output file extension -> format, for picking one from --output.
+FORMAT_EXTENSIONS = {".txt": "text", ".md": "md", ".markdown": "md", ".html": "html", ".htm": "html"}
+
+# How far back each section looks (the scouts' own windows: OpenAlex
+# queries go back 120 days, GDELT's default timespan is a week).
+DEFAULT_WINDOW_DAYS = {"science": 120, "society": 7}
+
+NO_SIGNAL = "No high-confidence signal today."
+
+
+class _Section(NamedTuple):
+    item_type: str
+    registry_key: str
+    title: str
+    label: str
+
+
+SECTIONS = (
+    _Section("science", "science", "SECTION I: THE HIDDEN MECHANICS (Science)", "Topic"),
+    _Section("society", "irony", "SECTION II: THE HUMAN PREDICAMENT (Society)", "Theme"),
+)
+
+TopicItems = Tuple[str, List[Dict[str, Any]]]
+
+
+class DossierSection(NamedTuple):
+    title: str
+    label: str
+    topics: List[TopicItems]
+
+
+def build_dossier(
+    registry: Registry,
+    db_path: Optional[str] = None,
+    per_topic: int = 1,
+    as_of: Optional[datetime] = None,
+    window_days: Optional[Dict[str, int]] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> List[DossierSection]:
+    """The top per_topic stored items for every registry topic, in registry order."""
+    windows = {**DEFAULT_WINDOW_DAYS, **(window_days or {})}
+    if conn is None:
+        with closing(get_connection(db_path)) as conn:
+            return build_dossier(registry, per_topic=per_topic, as_of=as_of, window_days=windows, conn=conn)
+    sections = []
+    for section in SECTIONS:
+        ranked = top_items(section.item_type, per_topic, windows[section.item_type], as_of=as_of, conn=conn)
+        topics = [(topic, ranked.get(topic, [])) for topic in registry.get(section.registry_key, {})]
+        sections.append(DossierSection(section.title, section.label, topics))
+    return sections
+
+
+def _date(item: Dict[str, Any]) -> str:
+    return item.get("published_date") or "Unknown Date"
+
+
+def _tone(item: Dict[str, Any]) -> str:
+    tone = item.get("tone")
+    return f"{tone:.2f}" if isinstance(tone, (int, float)) else "n/a"
+
+
+def _citations(item: Dict[str, Any]) -> str:
+    count = item.get("citations")
+    if count is None:
+        return ""
+    return f"{count} citation" + ("" if count == 1 else "s")
+
+
+# --- Plain text (the original Daily_Dossier.txt layout) ---------------------
+
+
+def _render_text(sections: List[DossierSection], day: str) -> Iterator[str]:
+    yield f"THE MYSTIC'S DOSSIER - {day}\n" + "=" * 60 + "\n\n"
+    for section in sections:
+        yield section.title + "\n" + "-" * 40 + "\n"
+        for topic, items in section.topics:
+            if not items:
+                yield f"{section.label}: {topic} - {NO_SIGNAL}\n\n"
+                continue
+            for item in items:
+                lines = [
+                    f"{section.label + ':':<9} {topic}",
+                    f"Headline: {item['headline']}",
+                    f"Source:   {item['source']} ({_date(item)})",
+                ]
+                if item["item_type"] == "science":
+                    if item.get("citations") is not None:
+                        lines.append(f"Cited:    {_citations(item)}")
+                    lines.append(f"Insight:  {item.get('summary') or ''}")
+                else:
+                    lines.append(f"Tone:     {_tone(item)} (Signal)")
+                lines.append(f"Link:     {item.get('url') or 'No URL'}")
+                yield "\n".join(lines) + "\n\n"
+        yield "\n"
+
+
+# --- Markdown ---------------------------------------------------------------
+
+_MARKDOWN_SPECIAL = str.maketrans({char: "\\" + char for char in "\\`*_[]<>#|"})
+
+
+def _md(value: Any) -> str:
+    return str(value or "").translate(_MARKDOWN_SPECIAL)
+
+
+def _md_url(url: Optional[str]) -> Optional[str]:
+    if url and url.lower().startswith(("http://", "https://")):
+        return url.replace(")", "%29").replace(" ", "%20")
+    return None
+
+
+def _render_markdown(sections: List[DossierSection], day: str) -> Iterator[str]:
+    yield f"# The Mystic's Dossier — {day}\n\n"
+    for section in sections:
+        yield f"## {section.title}\n\n"
+        for topic, items in section.topics:
+            yield f"### {_md(topic)}\n\n"
+            if not items:
+                yield f"_{NO_SIGNAL}_\n\n"
+                continue
+            for item in items:
+                url = _md_url(item.get("url"))
+                headline = f"[{_md(item['headline'])}]({url})" if url else _md(item["headline"])
+                details = [_md(item["source"]), _date(item)]
+                if item["item_type"] == "science":
+                    details.append(_citations(item))
+                else:
+                    details.append(f"tone {_tone(item)}")
+                block = f"- **{headline}**  \n  {' · '.join(filter(None, details))}\n"
+                if item.get("summary"):
+                    block += f"\n  > {_md(item['summary'])}\n"
+                yield block + "\n"
+
+
+# --- HTML (styled like the web UI) ------------------------------------------
+
+
+def _escape(value: Any) -> str:
+    return html.escape(str(value)) if value is not None else ""
+
+
+def _render_html(sections: List[DossierSection], day: str) -> Iterator[str]:
+    yield (
+        '<!doctype html>\n<html lang="en">\n<head>\n<meta charset="utf-8" />\n'
+        f"<title>The Mystic's Dossier - {_escape(day)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n"
+        f"<header><h1>The Mystic's Dossier</h1><p>{_escape(day)}</p></header>\n"
+    )
+    for section in sections:
+        yield f"<section>\n<h2>{_escape(section.title)}</h2>\n"
+        for topic, items in section.topics:
+            if not items:
+                yield f'<div class="item"><div class="meta"><span class="topic">{_escape(topic)}</span></div><p class="summary">{NO_SIGNAL}</p></div>\n'
+                continue
+            for item in items:
+                url = item.get("url")
+                href = _escape(url) if url and url.lower().startswith(("http://", "https://")) else "#"
+                extra = _citations(item) if item["item_type"] == "science" else f"tone {_tone(item)}"
+                yield (
+                    '<div class="item">\n  <div class="meta">'
+                    f'<span class="topic">{_escape(topic)}</span>'
+                    f'<span class="source">{_escape(item["source"])}</span>'
+                    f'<span class="date">{_escape(_date(item))}</span>'
+                    f'<span class="tone">{_escape(extra)}</span></div>\n'
+                    f'  <h3><a href="{href}" target="_blank" rel="noreferrer">{_escape(item["headline"])}</a></h3>\n'
+                    f'  <p class="summary">{_escape(item.get("summary"))}</p>\n</div>\n'
+                )
+        yield "</section>\n"
+    yield "</body>\n</html>\n"
+
+
+_RENDERERS = {"text": _render_text, "md": _render_markdown, "html": _render_html}
+
+
+def render_dossier(sections: List[DossierSection], fmt: str = "text", day: Optional[str] = None) -> Iterator[str]:
+    """Yield the dossier in chunks (one per section heading or item), so it can be written as it renders."""
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Unknown dossier format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return _RENDERERS[fmt](sections, day or datetime.now().strftime("%Y-%m-%d"))
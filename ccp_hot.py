@@ -0,0 +1,310 @@
+import json
+import sqlite3
+import threading
+from bisect import bisect_left
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ccp_metrics import CACHE_LOOKUPS
+from ccp_storage import (
+    ITEM_COLUMNS,
+    DataVersionWatcher,
+    ReadConnectionManager,
+    cluster_sizes,
+    decode_cursor,
+    item_epoch,
+    item_rows_after,
+    max_item_rowid,
+    newest_item_rows,
+)
+
+# Items held when --hot-items is given without a number.
+DEFAULT_HOT_ITEMS = 5000
+
+Key = Tuple[str, str]
+
+class HotItem:
+    """One item, built from a (rowid, *ITEM_COLUMNS) row, with its /api/items JSON encoded on first use."""
+
+    __slots__ = (
+        "rowid",
+        "id",
+        "item_type",
+        "topic",
+        "headline",
+        "source",
+        "published_date",
+        "summary",
+        "url",
+        "tone",
+        "citations",
+        "created_at",
+        "cluster_id",
+        "key",
+        "_json",
+    )
+
+    def __init__(self, row: tuple) -> None:
+        # One unpacking assignment is much cheaper than a setattr per column.
+        (
+            self.rowid,
+            self.id,
+            self.item_type,
+            self.topic,
+            self.headline,
+            self.source,
+            self.published_date,
+            self.summary,
+            self.url,
+            self.tone,
+            self.citations,
+            self.created_at,
+            self.cluster_id,
+        ) = row
+        self.key: Key = (self.created_at, self.id)
+        self._json: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {column: getattr(self, column) for column in ITEM_COLUMNS}
+
+    def json(self) -> str:
+        # Benign race: two threads may both encode it once.
+        if self._json is None:
+            self._json = json.dumps(self.as_dict())
+        return self._json
+
+
+# HotItem unpacks rows positionally, so it has to follow the storage schema.
+assert HotItem.__slots__[1 : len(ITEM_COLUMNS) + 1] == ITEM_COLUMNS, "HotItem is out of date with ITEM_COLUMNS"
+
+
+class _Index(NamedTuple):
+    """Items oldest first, with their (created_at, id) keys alongside for bisect."""
+
+    keys: List[Key]
+    items: List[HotItem]
+
+
+def _index(items: Iterable[HotItem]) -> _Index:
+    items = list(items)
+    return _Index([item.key for item in items], items)
+
+
+def _representative_rank(item: HotItem) -> Tuple[bool, Key]:
+    # The order storage._items_query picks a collapsed cluster's member by.
+    return item.id != item.cluster_id, item.key
+
+
+class _Snapshot(NamedTuple):
+    version: Optional[int]
+    epoch: int
+    # Highest rowid seen; later inserts are read with items_after.
+    mark: int
+    # True when the whole table fits, so a scan that runs out is a complete answer.
+    complete: bool
+    all: _Index
+    by_type: Dict[str, _Index]
+    by_topic: Dict[str, _Index]
+    # Items per near-duplicate cluster (stored anywhere), for every cluster
+    # with a hot member, and the hot members themselves.
+    cluster_sizes: Dict[str, int]
+    clusters: Dict[str, List[HotItem]]
+
+
+_EMPTY = _Snapshot(None, -1, 0, False, _Index([], []), {}, {}, {}, {})
+
+
+class HotIndex:
+    """
+    The newest capacity items, in memory, for answering list_items without
+    SQLite. Holds every item whose (created_at, id) is at or above the
+    oldest one it keeps, so any page that starts and ends inside that range
+    is exact; anything that would read past it returns None and the caller
+    queries the database.
+
+    refresh() is cheap to call per request: it compares PRAGMA data_version,
+    appends rows past its rowid high-water mark after ingest writes, and
+    reloads in full only when item_epoch says existing rows changed. Readers
+    work on an immutable snapshot that refresh swaps in whole.
+    """
+
+    def __init__(self, db_path: str, connections: ReadConnectionManager, capacity: int = DEFAULT_HOT_ITEMS) -> None:
+        self.db_path = db_path
+        self.capacity = capacity
+        self._connections = connections
+        self._version = DataVersionWatcher(db_path)
+        self._snapshot = _EMPTY
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._version.close()
+
+    def __len__(self) -> int:
+        return len(self._snapshot.all.items)
+
+    def refresh(self) -> None:
+        version = self._version.current()
+        if version == self._snapshot.version:
+            return
+        with self._lock:
+            if version == self._snapshot.version:
+                return
+            conn = self._connections.get()
+            conn.execute("BEGIN")
+            try:
+                self._snapshot = self._load(conn, version)
+            finally:
+                conn.execute("COMMIT")
+
+    def _load(self, conn: sqlite3.Connection, version: int) -> _Snapshot:
+        previous = self._snapshot
+        epoch = item_epoch(conn)
+        if epoch == previous.epoch and max_item_rowid(conn=conn) >= previous.mark:
+            rows = item_rows_after(previous.mark, self.capacity + 1, conn)
+            if len(rows) <= self.capacity:
+                return self._extend(previous, version, rows, conn)
+        rows = newest_item_rows(self.capacity + 1, conn)
+        complete = len(rows) <= self.capacity
+        items = [HotItem(row) for row in reversed(rows[: self.capacity])]
+        sizes = cluster_sizes({item.cluster_id for item in items}, conn=conn)
+        return self._build(version, epoch, max_item_rowid(conn=conn), complete, items, sizes)
+
+    def _extend(self, previous: _Snapshot, version: int, rows: List[tuple], conn: sqlite3.Connection) -> _Snapshot:
+        if not rows:
+            return previous._replace(version=version)
+        items = list(previous.all.items)
+        floor = previous.all.keys[0] if previous.all.keys and not previous.complete else None
+        sizes = dict(previous.cluster_sizes)
+        fresh = []
+        unknown = set()
+        for row in rows:
+            item = HotItem(row)
+            if item.cluster_id in sizes:
+                sizes[item.cluster_id] += 1
+            elif item.id == item.cluster_id:
+                sizes[item.id] = 1
+            else:
+                # Joined a cluster with no hot member; its count covers the rows just read.
+                unknown.add(item.cluster_id)
+            # Older than everything held: keeping it would leave a gap between it and the rest.
+            if floor is None or item.key > floor:
+                fresh.append(item)
+        if fresh:
+            items.extend(fresh)
+            # New items almost always sort last, so this is a near-linear timsort.
+            items.sort(key=attrgetter("key"))
+        if unknown:
+            sizes.update(cluster_sizes(unknown, conn=conn))
+        complete = previous.complete and len(items) <= self.capacity
+        items = items[-self.capacity :]
+        return self._build(version, previous.epoch, rows[-1][0], complete, items, sizes)
+
+    @staticmethod
+    def _build(
+        version: int,
+        epoch: int,
+        mark: int,
+        complete: bool,
+        items: List[HotItem],
+        sizes: Dict[str, int],
+    ) -> _Snapshot:
+        by_type: Dict[str, List[HotItem]] = {}
+        by_topic: Dict[str, List[HotItem]] = {}
+        clusters: Dict[str, List[HotItem]] = {}
+        for item in items:
+            by_type.setdefault(item.item_type, []).append(item)
+            by_topic.setdefault(item.topic, []).append(item)
+            clusters.setdefault(item.cluster_id, []).append(item)
+        return _Snapshot(
+            version,
+            epoch,
+            mark,
+            complete,
+            _index(items),
+            {value: _index(group) for value, group in by_type.items()},
+            {value: _index(group) for value, group in by_topic.items()},
+            {cluster_id: size for cluster_id, size in sizes.items() if cluster_id in clusters},
+            clusters,
+        )
+
+    def list_items(
+        self,
+        limit: int = 100,
+        item_type: Optional[str] = None,
+        topic: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None,
+        collapse: bool = False,
+    ) -> Optional[List[HotItem]]:
+        """storage.list_items' answer from memory, or None if it may need older items."""
+        snapshot = self._snapshot
+        if snapshot.version is None:
+            return None
+        if topic:
+            index = snapshot.by_topic.get(topic)
+        elif item_type:
+            index = snapshot.by_type.get(item_type)
+        else:
+            index = snapshot.all
+        if index is None:
+            index = _Index([], [])
+        end = len(index.keys)
+        if until:
+            end = bisect_left(index.keys, (until,))
+        if cursor:
+            end = min(end, bisect_left(index.keys, decode_cursor(cursor)))
+        start = bisect_left(index.keys, (since,)) if since else 0
+
+        def passes(item: HotItem) -> bool:
+            return (
+                (not item_type or item.item_type == item_type)
+                and (not topic or item.topic == topic)
+                and (not source or item.source == source)
+                and (not since or item.created_at >= since)
+                and (not until or item.created_at < until)
+            )
+
+        filtered = bool(item_type or topic or source or since or until)
+        items = []
+        for position in range(end - 1, start - 1, -1):
+            item = index.items[position]
+            if (item_type and item.item_type != item_type) or (source and item.source != source):
+                continue
+            if collapse and item.id != item.cluster_id:
+                # Mirrors storage._items_query: without filters only founders
+                # represent their clusters, with filters the best passing member.
+                if not filtered:
+                    continue
+                members = snapshot.clusters[item.cluster_id]
+                if not snapshot.complete and len(members) < snapshot.cluster_sizes.get(item.cluster_id, 0):
+                    # Some members are older than the set and might rank first.
+                    CACHE_LOOKUPS.inc(cache="hot", result="miss")
+                    return None
+                if min(filter(passes, members), key=_representative_rank) is not item:
+                    continue
+            items.append(item)
+            if len(items) >= limit:
+                break
+        else:
+            # Ran out of hot items. That is the whole answer only if nothing
+            # older could match: the table fits, or since cuts off inside the set.
+            floor = snapshot.all.keys[0] if snapshot.all.keys else None
+            if not (snapshot.complete or (since and floor is not None and (since,) > floor)):
+                CACHE_LOOKUPS.inc(cache="hot", result="miss")
+                return None
+        CACHE_LOOKUPS.inc(cache="hot", result="hit")
+        return items
+
+    @property
+    def mark(self) -> int:
+        """Highest rowid the current snapshot has seen."""
+        return self._snapshot.mark
+
+    def latest_created_at(self) -> Optional[str]:
+        keys = self._snapshot.all.keys
+        return keys[-1][0] if keys else None
+
+    def cluster_size(self, item: HotItem) -> int:
+        return self._snapshot.cluster_sizes.get(item.cluster_id, 1)
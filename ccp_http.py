@@ -0,0 +1,345 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ccp_metrics import CACHE_LOOKUPS
+
+# Statuses worth another attempt: throttling and transient upstream trouble.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# (requests per second, burst size) per host.
+# GDELT asks clients to keep to one request every five seconds; OpenAlex's
+# polite pool allows ten per second.
+DEFAULT_HOST_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "api.gdeltproject.org": (0.2, 1),
+    "api.openalex.org": (10.0, 10),
+}
+
+
+# How long a cached response stays fresh, per host (seconds). Papers change
+# slowly; the GDELT news window moves every few minutes.
+DEFAULT_CACHE_TTLS: Dict[str, float] = {
+    "api.gdeltproject.org": 15 * 60,
+    "api.openalex.org": 6 * 60 * 60,
+}
+DEFAULT_CACHE_TTL = 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Dates and GDELT datetimes inside a URL. Fixture keys blank them out so a
+# recording still matches when the query window has moved on.
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}|\d{14}")
+
+
+class ReplayMissError(requests.exceptions.RequestException):
+    """Replay mode found no recorded response for a request."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class DiskResponseCache:
+    """
+    Content-addressed store of successful GET responses, one JSON file per
+    request, named by the SHA-256 of its full URL (query string included).
+
+    Entries expire after a per-host TTL, and the least recently used files
+    are evicted once the directory grows past max_bytes (file mtimes double
+    as the LRU clock). With fixtures=True the store becomes a set of recorded
+    fixtures instead: entries never expire or get evicted, and dates in the
+    URL are ignored when matching.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_CACHE_TTL,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        fixtures: bool = False,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttls = DEFAULT_CACHE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.fixtures = fixtures
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self.directory.glob("*/*.json"))
+
+    def _path(self, url: str) -> Path:
+        key_url = _DATE_PATTERN.sub("<date>", url) if self.fixtures else url
+        key = hashlib.sha256(key_url.encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, url: str) -> Optional[requests.Response]:
+        path = self._path(url)
+        try:
+            with open(path, encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if not self.fixtures:
+            ttl = self.ttls.get(urlparse(url).hostname or "", self.default_ttl)
+            if time.time() - entry["stored_at"] > ttl:
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        response = requests.Response()
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry["encoding"]
+        response.url = entry["url"]
+        response._content = base64.b64decode(entry["body"])
+        return response
+
+    def put(self, url: str, response: requests.Response) -> None:
+        entry = {
+            "url": url,
+            "stored_at": time.time(),
+            "status_code": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            "encoding": response.encoding,
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        path = self._path(url)
+        path.parent.mkdir(exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file.
+        temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle)
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(temporary, path)
+            self._size += path.stat().st_size - previous
+            if not self.fixtures and self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back under 90% of max_bytes."""
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self._size -= size
+
+
+class PooledSession:
+    """Keep-alive HTTP session with bounded retries and per-host rate limiting."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        pool_maxsize: int = 10,
+        host_rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        cache: Optional[DiskResponseCache] = None,
+        mode: str = "cache",
+    ) -> None:
+        """
+        mode only matters with a cache: "cache" serves fresh entries and
+        stores new ones, "record" always fetches and stores, and "replay"
+        never touches the network (a missing entry raises ReplayMissError).
+        """
+        if mode not in ("cache", "record", "replay"):
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache = cache
+        self.mode = mode
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(DEFAULT_HOST_RATE_LIMITS), pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        limits = DEFAULT_HOST_RATE_LIMITS if host_rate_limits is None else host_rate_limits
+        self._buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in limits.items()}
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "throttled_seconds": 0.0,
+            "retry_after": 0,
+            "failures": 0,
+            "cache_hits": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: a random delay up to the exponential ceiling.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _throttle(self, url: str) -> None:
+        bucket = self._buckets.get(urlparse(url).hostname or "")
+        if bucket is None:
+            return
+        waited = bucket.acquire()
+        if waited:
+            self._count("throttled")
+            self._count("throttled_seconds", waited)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET with retries; raises the last error once retries are exhausted."""
+        if self.cache is None:
+            return self._fetch(url, **kwargs)
+        full_url = requests.Request("GET", url, params=kwargs.pop("params", None)).prepare().url
+        if self.mode != "record":
+            cached = self.cache.get(full_url)
+            CACHE_LOOKUPS.inc(cache="http_disk", result="miss" if cached is None else "hit")
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+            if self.mode == "replay":
+                raise ReplayMissError(f"No recorded response for {full_url}")
+        response = self._fetch(full_url, **kwargs)
+        if response.status_code == 200:
+            self.cache.put(full_url, response)
+        return response
+
+    def _fetch(self, url: str, **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            self._throttle(url)
+            self._count("requests")
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._count("failures")
+                    return response
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    self._count("retry_after")
+                    delay = min(retry_after, self.backoff_max)
+                else:
+                    delay = self._backoff(attempt)
+                response.close()
+            self._count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+
+_shared_session: Optional[PooledSession] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_session() -> PooledSession:
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = PooledSession()
+        return _shared_session
+
+
+def configure_shared_session(**kwargs: Any) -> PooledSession:
+    """Replace the shared session (e.g. to add a cache); call before creating scouts."""
+    global _shared_session
+    with _shared_lock:
+        _shared_session = PooledSession(**kwargs)
+        return _shared_session
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--cache-dir",
+        help="Cache API responses on disk here and reuse them while fresh.",
+    )
+    group.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Fetch from the APIs and save every response as a fixture in DIR.",
+    )
+    group.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="Answer API requests only from fixtures in DIR, without touching the network.",
+    )
+
+
+def configure_cache_from_args(args: argparse.Namespace) -> None:
+    if args.cache_dir:
+        configure_shared_session(cache=DiskResponseCache(args.cache_dir))
+    elif args.record:
+        configure_shared_session(cache=DiskResponseCache(args.record, fixtures=True), mode="record")
+    elif args.replay:
+        configure_shared_session(cache=DiskResponseCache(args.replay, fixtures=True), mode="replay")
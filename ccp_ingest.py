@@ -1,11 +1,29 @@
 import argparse
 import hashlib
-from datetime import datetime
-from typing import Dict, Iterable, List
+import json
+import queue
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 import agent_irony
 import agent_science
-from ccp_storage import init_db, save_items, DEFAULT_DB_PATH
+from ccp_http import add_cache_arguments, configure_cache_from_args, get_shared_session
+from ccp_queries import PlannedRequest, Registry, Topic, load_queries, plan_requests, registry_topics
+from ccp_scheduler import DEFAULT_JITTER, Job, Scheduler
+from ccp_storage import (
+    DEFAULT_DB_PATH,
+    get_write_connection,
+    init_db,
+    list_watermarks,
+    save_items,
+    update_watermarks,
+)
 
 
 def _make_item_id(parts: Iterable[str]) -> str:
@@ -22,8 +40,10 @@ def _normalize_science_item(topic: str, paper: Dict) -> Dict:
         "source": paper.get("Journal", "Unknown Source"),
         "published_date": paper.get("Date"),
         "summary": paper.get("Abstract_Snippet"),
+        "body": paper.get("Abstract"),
         "url": paper.get("URL"),
         "tone": None,
+        "citations": paper.get("Citations"),
         "created_at": datetime.utcnow().isoformat(),
     }
 
@@ -43,42 +63,710 @@ def _normalize_irony_item(theme: str, story: Dict) -> Dict:
     }
 
 
-def ingest(db_path: str, days_back: int) -> int:
+# Upper bound on simultaneous requests per API, regardless of --concurrency.
+# GDELT in particular throttles aggressively, so it gets a tighter cap.
+DEFAULT_SOURCE_CONCURRENCY = {
+    "science": 4,
+    "irony": 2,
+}
+
+
+# Raw result field that carries each source's watermark value.
+WATERMARK_FIELDS = {
+    "science": "Date",
+    "irony": "Seen_At",
+}
+# Incremental runs re-fetch a little before the watermark: OpenAlex fills in
+# works with earlier publication dates as it indexes them, and GDELT's seendate
+# lags publication. INSERT OR IGNORE absorbs the overlap.
+WATERMARK_OVERLAP = {
+    "science": timedelta(days=3),
+    "irony": timedelta(hours=1),
+}
+# IronyScout's default timespan; a delta window never reaches further back.
+IRONY_WINDOW = timedelta(days=7)
+GDELT_SEENDATE_FORMAT = "%Y%m%dT%H%M%SZ"
+
+# Items handed to save_items at a time; bounds memory during large backfills.
+DEFAULT_BATCH_SIZE = 500
+# Papers per science query; raise it (with --page-size up to 200) to backfill.
+DEFAULT_SCIENCE_MAX_RESULTS = 5
+
+# Seconds between runs of each query in --daemon mode. GDELT refreshes every
+# 15 minutes; new OpenAlex works trickle in over the day.
+DEFAULT_DAEMON_INTERVALS = {
+    "irony": 5 * 60,
+    "science": 6 * 60 * 60,
+}
+
+
+class _QueryTask(NamedTuple):
+    request: PlannedRequest
+    fetch: Callable[[], Iterable[Dict]]
+
+    @property
+    def source(self) -> str:
+        return self.request.source
+
+    @property
+    def label(self) -> str:
+        return self.request.label
+
+
+class _QueryProgress:
+    """
+    Tracks one request's run so its topics' watermarks are advanced only after
+    its items are saved, along with the per-stage timings for the run report.
+    """
+
+    def __init__(self, task: _QueryTask) -> None:
+        self.task = task
+        self.newest_seen: Optional[str] = None
+        self.succeeded = False
+        self.error: Optional[str] = None
+        self.items = 0
+        self.written = 0
+        # Results assigned to each topic and the newest of them, and results
+        # no topic claimed (those are assigned to every topic of the request).
+        self.matched: Counter = Counter()
+        self.topic_newest_seen: Dict[Topic, str] = {}
+        self.unmatched = 0
+        self.fetch_seconds = 0.0
+        self.normalize_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def report(self) -> Dict:
+        return {
+            "source": self.task.source,
+            "topics": [topic.topic for topic in self.task.request.topics],
+            "query": self.task.request.query,
+            "succeeded": self.succeeded,
+            "error": self.error,
+            "items": self.items,
+            "written": self.written,
+            "matched": {topic.topic: self.matched[topic] for topic in self.task.request.topics},
+            "unmatched": self.unmatched,
+            "newest_seen": self.newest_seen,
+            "fetch_seconds": round(self.fetch_seconds, 4),
+            "normalize_seconds": round(self.normalize_seconds, 4),
+            "write_seconds": round(self.write_seconds, 4),
+        }
+
+    def observe(self, result: Dict) -> Optional[str]:
+        """Folds result into newest_seen and returns its watermark value, if usable."""
+        value = result.get(WATERMARK_FIELDS[self.task.source])
+        # Skip placeholders such as "Unknown Date"; all real values start with a year
+        if not (value and value[:4].isdigit()):
+            return None
+        if self.newest_seen is None or value > self.newest_seen:
+            self.newest_seen = value
+        return value
+
+
+def _science_from_date(newest_seen: Optional[str], days_back: int) -> Optional[date]:
+    if not newest_seen:
+        return None
+    try:
+        start = date.fromisoformat(newest_seen[:10]) - WATERMARK_OVERLAP["science"]
+    except ValueError:
+        return None
+    return max(start, date.today() - timedelta(days=days_back))
+
+
+def _irony_start_datetime(newest_seen: Optional[str]) -> Optional[datetime]:
+    if not newest_seen:
+        return None
+    try:
+        start = datetime.strptime(newest_seen, GDELT_SEENDATE_FORMAT) - WATERMARK_OVERLAP["irony"]
+    except ValueError:
+        return None
+    return max(start, datetime.utcnow() - IRONY_WINDOW)
+
+
+Watermarks = Dict[Tuple[str, str, str], Dict]
+
+
+def _plan(
+    registry: Registry,
+    stats: Watermarks,
+    max_requests: Optional[int] = None,
+    merge: bool = True,
+    science_max_results: Optional[int] = DEFAULT_SCIENCE_MAX_RESULTS,
+) -> List[PlannedRequest]:
+    # OpenAlex sorts by citations, so under one shared cap a merged request's
+    # best-cited topics crowd out the rest; science topics merge only uncapped.
+    merge_by_source = {"science": merge and not science_max_results, "irony": merge}
+    requests = []
+    for source in ("science", "irony"):
+        requests += plan_requests(
+            registry_topics(registry, source), stats, max_requests=max_requests, merge=merge_by_source[source]
+        )
+    return requests
+
+
+def _request_newest_seen(request: PlannedRequest, watermarks: Watermarks) -> Optional[str]:
+    # A merged request starts from its least advanced topic, so it covers all of them.
+    values = [(watermarks.get(tuple(topic)) or {}).get("newest_seen") for topic in request.topics]
+    return None if None in values else min(values)
+
+
+def _build_tasks(
+    scout_science,
+    scout_irony,
+    requests: Iterable[PlannedRequest],
+    days_back: int,
+    science_max_results: Optional[int] = DEFAULT_SCIENCE_MAX_RESULTS,
+    page_size: int = agent_science.MAX_PER_PAGE,
+    watermarks: Optional[Watermarks] = None,
+) -> List[_QueryTask]:
+    watermarks = watermarks or {}
+    tasks = []
+    for request in requests:
+        newest_seen = _request_newest_seen(request, watermarks)
+        if request.source == "science":
+            tasks.append(
+                _science_task(scout_science, request, newest_seen, days_back, science_max_results, page_size)
+            )
+        else:
+            tasks.append(_irony_task(scout_irony, request, newest_seen))
+    return tasks
+
+
+def _science_task(
+    scout_science,
+    request: PlannedRequest,
+    newest_seen: Optional[str],
+    days_back: int,
+    science_max_results: Optional[int],
+    page_size: int,
+) -> _QueryTask:
+    from_date = _science_from_date(newest_seen, days_back)
+    return _QueryTask(
+        request,
+        lambda: scout_science.iter_papers(
+            request.query,
+            days_back=days_back,
+            per_page=page_size,
+            max_results=science_max_results,
+            from_date=from_date,
+        ),
+    )
+
+
+def _irony_task(scout_irony, request: PlannedRequest, newest_seen: Optional[str]) -> _QueryTask:
+    start = _irony_start_datetime(newest_seen)
+    return _QueryTask(
+        request,
+        lambda: scout_irony.fetch_irony(
+            request.query,
+            request.label,
+            start_datetime=start,
+            raise_errors=True,
+            max_records=agent_irony.DEFAULT_MAX_RECORDS * len(request.topics),
+        ),
+    )
+
+
+def _match_text(source: str, result: Dict) -> str:
+    # What the local matcher sees: GDELT only returns titles and URLs.
+    if source == "science":
+        return " ".join([result.get("Headline") or "", result.get("Abstract") or "", *filter(None, result.get("Key_Topics") or [])])
+    return f"{result.get('Headline') or ''} {result.get('URL') or ''}"
+
+
+def _normalize_results(progress: _QueryProgress, result: Dict, seen: Optional[str]) -> List[Dict]:
+    """One item per topic the result belongs to."""
+    task = progress.task
+    topics = task.request.claim(_match_text(task.source, result))
+    if not topics:
+        # The API matched fields the local matcher never sees (abstracts it
+        # omits, article bodies); dropping the result would lose items an
+        # unmerged run keeps, so every topic of the request gets it.
+        progress.unmatched += 1
+        topics = task.request.topics
+    normalize = _normalize_science_item if task.source == "science" else _normalize_irony_item
+    items = []
+    for topic in topics:
+        progress.matched[topic] += 1
+        if seen and seen > progress.topic_newest_seen.get(topic, ""):
+            progress.topic_newest_seen[topic] = seen
+        items.append(normalize(topic.topic, result))
+    return items
+
+
+def _normalize_observed(progress: _QueryProgress, results: Iterable[Dict]) -> Iterator[Dict]:
+    # Paging scouts fetch lazily, so time spent pulling the next result is fetch time.
+    iterator = iter(results)
+    while True:
+        started = time.perf_counter()
+        try:
+            result = next(iterator)
+        except StopIteration:
+            progress.fetch_seconds += time.perf_counter() - started
+            return
+        fetched = time.perf_counter()
+        progress.fetch_seconds += fetched - started
+        seen = progress.observe(result)
+        items = _normalize_results(progress, result, seen)
+        progress.normalize_seconds += time.perf_counter() - fetched
+        progress.items += len(items)
+        yield from items
+
+
+def _batched(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stream_task(
+    progress: _QueryProgress,
+    batch_size: int,
+    limiter: Optional[threading.Semaphore] = None,
+) -> Iterator[List[Dict]]:
+    """Yields normalized batches for one query; failures end only this query's stream."""
+    task = progress.task
+    try:
+        with limiter or nullcontext():
+            started = time.perf_counter()
+            results = task.fetch()
+            progress.fetch_seconds += time.perf_counter() - started
+            yield from _batched(_normalize_observed(progress, results), batch_size)
+        progress.succeeded = True
+    except Exception as exc:  # one bad query must not sink the whole run
+        progress.error = str(exc)
+        print(f"Query failed for {task.source}/{task.label}: {exc}")
+
+
+def _write_batch(progress: _QueryProgress, batch: List[Dict], write: Callable[[List[Dict]], int]) -> int:
+    started = time.perf_counter()
+    written = write(batch)
+    progress.write_seconds += time.perf_counter() - started
+    progress.written += written
+    return written
+
+
+def _finish_task(progress: _QueryProgress, db_path: str) -> None:
+    # A topic's watermark only moves past results assigned to it; with no
+    # matches newest_seen is None and update_watermarks keeps the old one.
+    if progress.succeeded:
+        update_watermarks(
+            [
+                (topic.source, topic.topic, topic.query, progress.topic_newest_seen.get(topic), progress.matched[topic])
+                for topic in progress.task.request.topics
+            ],
+            db_path,
+        )
+
+
+def _source_limits(concurrency: int, source_concurrency: Optional[Dict[str, int]]) -> Dict[str, int]:
+    limits = dict(DEFAULT_SOURCE_CONCURRENCY)
+    limits.update(source_concurrency or {})
+    return {source: max(1, min(concurrency, limit)) for source, limit in limits.items()}
+
+
+def _ingest_concurrently(
+    progresses: List[_QueryProgress],
+    db_path: str,
+    write: Callable[[List[Dict]], int],
+    concurrency: int,
+    batch_size: int,
+    source_concurrency: Optional[Dict[str, int]],
+) -> int:
+    limiters = {
+        source: threading.Semaphore(limit)
+        for source, limit in _source_limits(concurrency, source_concurrency).items()
+    }
+    # Workers fetch and normalize; this thread is the only writer. The bounded
+    # queue applies back-pressure so at most a few batches are ever in memory.
+    # Batches travel with their query's _QueryProgress; the bare progress
+    # follows its last batch and marks the query finished.
+    batches: "queue.Queue[object]" = queue.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+
+    def put(entry: object) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def work(progress: _QueryProgress) -> None:
+        try:
+            for batch in _stream_task(progress, batch_size, limiters.get(progress.task.source)):
+                if not put((progress, batch)):
+                    return
+        finally:
+            put(progress)
+
+    inserted = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ccp-ingest") as pool:
+        for progress in progresses:
+            pool.submit(work, progress)
+        try:
+            remaining = len(progresses)
+            while remaining:
+                entry = batches.get()
+                if isinstance(entry, _QueryProgress):
+                    _finish_task(entry, db_path)
+                    remaining -= 1
+                else:
+                    inserted += _write_batch(*entry, write)
+        finally:
+            stop.set()
+    return inserted
+
+
+def ingest(
+    db_path: str,
+    days_back: int,
+    concurrency: int = 1,
+    source_concurrency: Optional[Dict[str, int]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    science_max_results: Optional[int] = DEFAULT_SCIENCE_MAX_RESULTS,
+    page_size: int = agent_science.MAX_PER_PAGE,
+    full_refresh: bool = False,
+    upsert: bool = False,
+    report_path: Optional[str] = None,
+    queries_path: Optional[str] = None,
+    max_requests: Optional[int] = None,
+    merge: bool = True,
+) -> int:
+    """
+    Fetch the registry's queries and save the results; returns the number of
+    rows written. Topics are merged into as few API requests as possible and
+    run in order of expected yield; max_requests caps the requests per source
+    (the rest wait for a later run). With report_path, a JSON run report with
+    per-request and per-source stage timings is written there afterwards.
+    """
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
     init_db(db_path)
     scout_science = agent_science.ScienceScout()
     scout_irony = agent_irony.IronyScout()
+    stats = list_watermarks(db_path)
+    tasks = _build_tasks(
+        scout_science,
+        scout_irony,
+        _plan(
+            load_queries(queries_path),
+            stats,
+            max_requests=max_requests,
+            merge=merge,
+            science_max_results=science_max_results,
+        ),
+        days_back,
+        science_max_results=science_max_results,
+        page_size=page_size,
+        watermarks=None if full_refresh else stats,
+    )
 
-    science_queries = {
-        "Mechanics of Consciousness": "mitochondria AND sleep",
-        "Ecological Intelligence": "plant signaling",
-        "Quantum Bridges": "quantum biology",
-    }
-    irony_queries = {
-        "The Tech Trap": '"Artificial Intelligence" (risk OR error)',
-        "The Expensive Failure": "budget (waste OR cost OR delay)",
-        "The Green Dilemma": "environment (problem OR crisis)",
+    progresses = [_QueryProgress(task) for task in tasks]
+
+    # One writer connection for the whole run, so its PRAGMAs are set once.
+    conn = get_write_connection(db_path)
+    try:
+        def write(batch: List[Dict]) -> int:
+            return save_items(batch, batch_size=batch_size, upsert=upsert, conn=conn)
+
+        if concurrency > 1:
+            inserted = _ingest_concurrently(progresses, db_path, write, concurrency, batch_size, source_concurrency)
+        else:
+            inserted = 0
+            for progress in progresses:
+                for batch in _stream_task(progress, batch_size):
+                    inserted += _write_batch(progress, batch, write)
+                _finish_task(progress, db_path)
+    finally:
+        conn.close()
+
+    if report_path:
+        _write_report(report_path, progresses, inserted, started_at, time.perf_counter() - started)
+    return inserted
+
+
+def _write_report(
+    path: str,
+    progresses: List[_QueryProgress],
+    inserted: int,
+    started_at: datetime,
+    seconds: float,
+) -> None:
+    queries = [progress.report() for progress in progresses]
+    sources: Dict[str, Dict] = {}
+    for query in queries:
+        totals = sources.setdefault(
+            query["source"],
+            {"requests": 0, "topics": 0, "failed": 0, "items": 0, "unmatched": 0, "written": 0,
+             "fetch_seconds": 0.0, "normalize_seconds": 0.0, "write_seconds": 0.0},
+        )
+        totals["requests"] += 1
+        totals["topics"] += len(query["topics"])
+        totals["failed"] += not query["succeeded"]
+        for field in ("items", "unmatched", "written", "fetch_seconds", "normalize_seconds", "write_seconds"):
+            totals[field] += query[field]
+    for totals in sources.values():
+        for field in ("fetch_seconds", "normalize_seconds", "write_seconds"):
+            totals[field] = round(totals[field], 4)
+    report = {
+        "started_at": started_at.isoformat(),
+        "seconds": round(seconds, 3),
+        "inserted": inserted,
+        "sources": sources,
+        "requests": queries,
+        "http": get_shared_session().stats(),
     }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+
+
+def run_daemon(
+    db_path: str,
+    days_back: int,
+    intervals: Optional[Dict[str, int]] = None,
+    concurrency: int = 1,
+    source_concurrency: Optional[Dict[str, int]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    science_max_results: Optional[int] = DEFAULT_SCIENCE_MAX_RESULTS,
+    page_size: int = agent_science.MAX_PER_PAGE,
+    upsert: bool = False,
+    jitter: float = DEFAULT_JITTER,
+    queries_path: Optional[str] = None,
+    merge: bool = True,
+    full_refresh: bool = False,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Run every planned request on its source's interval until SIGTERM/SIGINT,
+    reusing one pair of scouts (and their HTTP pool) and one write connection
+    throughout. Requests are planned once at startup; each run starts from
+    its topics' current watermarks, except that with full_refresh the first
+    run of each request fetches its full window. Returns per-request
+    run/skip/failure counts.
+    """
+    init_db(db_path)
+    scout_science = agent_science.ScienceScout()
+    scout_irony = agent_irony.IronyScout()
+    intervals = {**DEFAULT_DAEMON_INTERVALS, **(intervals or {})}
+    conn = get_write_connection(db_path, check_same_thread=False)
+    write_lock = threading.Lock()
+    scheduler: Optional[Scheduler] = None
+
+    def write(batch: List[Dict]) -> int:
+        with write_lock:
+            return save_items(batch, batch_size=batch_size, upsert=upsert, conn=conn)
+
+    def make_job(request: PlannedRequest) -> Job:
+        refresh_next = full_refresh
+
+        def run() -> None:
+            nonlocal refresh_next
+            ignore_watermarks, refresh_next = refresh_next, False
+            (task,) = _build_tasks(
+                scout_science,
+                scout_irony,
+                [request],
+                days_back,
+                science_max_results=science_max_results,
+                page_size=page_size,
+                watermarks=None if ignore_watermarks else list_watermarks(db_path),
+            )
+            progress = _QueryProgress(task)
+            started = time.perf_counter()
+            batches = _stream_task(progress, batch_size)
+            try:
+                for batch in batches:
+                    _write_batch(progress, batch, write)
+                    if scheduler.stopping:
+                        # Unfinished, so the watermark stays put and the next start refetches.
+                        break
+            finally:
+                batches.close()
+            with write_lock:
+                _finish_task(progress, db_path)
+            outcome = "ok" if progress.succeeded else "incomplete"
+            print(
+                f"{datetime.utcnow():%Y-%m-%d %H:%M:%S} {request.source}/{request.label}: {outcome}, "
+                f"{progress.written} new of {progress.items} in {time.perf_counter() - started:.1f}s"
+            )
+
+        return Job(f"{request.source}/{request.label}", intervals[request.source], run, group=request.source)
+
+    registry = load_queries(queries_path)
+    planned = _plan(registry, list_watermarks(db_path), merge=merge, science_max_results=science_max_results)
+    jobs = [make_job(request) for request in planned]
+    # Each source runs on its own pool, so a long science backfill never holds up GDELT.
+    scheduler = Scheduler(jobs, group_workers=_source_limits(concurrency, source_concurrency), jitter=jitter)
 
-    items: List[Dict] = []
-    for topic, query in science_queries.items():
-        papers = scout_science.fetch_papers(query, days_back=days_back)
-        items.extend(_normalize_science_item(topic, paper) for paper in papers)
+    previous_handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            previous_handlers[signum] = signal.signal(signum, lambda signum, frame: scheduler.stop())
+    intervals_text = ", ".join(f"{source} every {seconds}s" for source, seconds in intervals.items())
+    topics = sum(len(topics) for topics in registry.values())
+    print(f"Ingest daemon started: {topics} topics in {len(jobs)} requests, {intervals_text}")
+    try:
+        scheduler.run_forever()
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        conn.close()
+    print("Ingest daemon stopped")
+    return scheduler.summary()
 
-    for theme, query in irony_queries.items():
-        stories = scout_irony.fetch_irony(query, theme)
-        items.extend(_normalize_irony_item(theme, story) for story in stories)
 
-    return save_items(items, db_path)
+def _parse_source_values(values: Optional[List[str]], option: str) -> Dict[str, int]:
+    parsed: Dict[str, int] = {}
+    for value in values or []:
+        source, _, number = value.partition("=")
+        if source not in DEFAULT_SOURCE_CONCURRENCY or not number.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"Invalid {option} {value!r}; expected one of "
+                f"{', '.join(DEFAULT_SOURCE_CONCURRENCY)} as SOURCE=N."
+            )
+        parsed[source] = int(number)
+    return parsed
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Ingest items into the CCP database.")
     parser.add_argument("--db-path", default=DEFAULT_DB_PATH, help="Path to the SQLite database.")
     parser.add_argument("--days-back", type=int, default=120, help="Days back for science queries.")
+    parser.add_argument("--queries", help="Query registry JSON file (default: queries.json next to this script).")
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        help="API requests per source this run, highest expected yield first; the rest wait for later runs.",
+    )
+    parser.add_argument(
+        "--no-merge",
+        action="store_true",
+        help="Send one API request per topic instead of merging compatible topics.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of scout queries to run in parallel (1 runs them sequentially).",
+    )
+    parser.add_argument(
+        "--source-concurrency",
+        action="append",
+        metavar="SOURCE=N",
+        help="Per-API cap on parallel queries, e.g. irony=1. May be repeated.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Items written to the database per batch.",
+    )
+    parser.add_argument(
+        "--max-results",
+        type=int,
+        default=DEFAULT_SCIENCE_MAX_RESULTS,
+        help="Papers per science query; 0 walks every OpenAlex cursor page (backfill).",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=agent_science.MAX_PER_PAGE,
+        help=f"OpenAlex results per page (max {agent_science.MAX_PER_PAGE}).",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignore per-query watermarks and re-fetch the full window (with --daemon: on each request's first run).",
+    )
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Refresh summary, tone and citations of items that already exist instead of skipping them.",
+    )
+    parser.add_argument(
+        "--report-path",
+        help="Write a JSON run report (per-query and per-source fetch/normalize/write timings) here.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and re-run each query on its source's interval until SIGTERM.",
+    )
+    parser.add_argument(
+        "--interval",
+        action="append",
+        metavar="SOURCE=SECONDS",
+        help="Seconds between runs of each query in --daemon mode, e.g. irony=300. May be repeated.",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=DEFAULT_JITTER,
+        help="Random spread applied to --daemon intervals, as a fraction of the interval.",
+    )
+    add_cache_arguments(parser)
     return parser
 
 
 if __name__ == "__main__":
-    args = build_parser().parse_args()
-    inserted = ingest(args.db_path, args.days_back)
-    print(f"Inserted {inserted} items into {args.db_path}")
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        source_limits = _parse_source_values(args.source_concurrency, "--source-concurrency")
+        intervals = _parse_source_values(args.interval, "--interval")
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+    try:
+        load_queries(args.queries)
+    except (OSError, ValueError) as exc:
+        parser.error(f"cannot load query registry: {exc}")
+    configure_cache_from_args(args)
+    if args.daemon:
+        summary = run_daemon(
+            args.db_path,
+            args.days_back,
+            intervals=intervals,
+            concurrency=args.concurrency,
+            source_concurrency=source_limits,
+            batch_size=args.batch_size,
+            science_max_results=args.max_results or None,
+            page_size=args.page_size,
+            upsert=args.upsert,
+            jitter=args.jitter,
+            queries_path=args.queries,
+            merge=not args.no_merge,
+            full_refresh=args.full_refresh,
+        )
+        for name, counts in summary.items():
+            print(f"  {name}: {counts['runs']} runs, {counts['skipped']} skipped, {counts['failures']} failed")
+        raise SystemExit(0)
+    inserted = ingest(
+        args.db_path,
+        args.days_back,
+        concurrency=args.concurrency,
+        source_concurrency=source_limits,
+        batch_size=args.batch_size,
+        science_max_results=args.max_results or None,
+        page_size=args.page_size,
+        full_refresh=args.full_refresh,
+        upsert=args.upsert,
+        report_path=args.report_path,
+        queries_path=args.queries,
+        max_requests=args.max_requests,
+        merge=not args.no_merge,
+    )
+    verb = "Inserted or refreshed" if args.upsert else "Inserted"
+    print(f"{verb} {inserted} items into {args.db_path}")
+    http_stats = get_shared_session().stats()
+    print(
+        "HTTP: {requests} requests, {retries} retries ({retry_after} honoured Retry-After), "
+        "{throttled} throttled ({throttled_seconds:.1f}s waiting), {failures} failures, "
+        "{cache_hits} served from cache".format(**http_stats)
+    )
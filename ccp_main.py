@@ -1,96 +1,63 @@
-import agent_science
-import agent_irony
+import argparse
 import os  # <--- Added to find file path
+import sys
+import time
 from datetime import datetime
 
-def generate_dossier():
-    print("🚀 LAUNCHING CONSCIOUS CURATION PIPELINE...\n")
-    
-    # 1. INITIALIZE AGENTS
-    scout_science = agent_science.ScienceScout()
-    scout_irony = agent_irony.IronyScout()
-    
-    dossier_lines = []
-    dossier_lines.append(f"THE MYSTIC'S DOSSIER - {datetime.now().strftime('%Y-%m-%d')}")
-    dossier_lines.append("="*60)
-    dossier_lines.append("")
+from ccp_dossier import FORMAT_EXTENSIONS, FORMATS, build_dossier, render_dossier
+from ccp_queries import load_queries
+from ccp_storage import DEFAULT_DB_PATH, init_db
 
-    # ---------------------------------------------------------
-    # SECTION 1: THE HIDDEN MECHANICS (Science Scout)
-    # ---------------------------------------------------------
-    print("🔬 Step 1: Querying Science Vector...")
-    science_queries = {
-        "Mechanics of Consciousness": "mitochondria AND sleep",
-        "Ecological Intelligence": "plant signaling",
-        "Quantum Bridges": "quantum biology"
-    }
-    
-    dossier_lines.append("SECTION I: THE HIDDEN MECHANICS (Science)")
-    dossier_lines.append("-" * 40)
-    
-    for topic, query in science_queries.items():
-        print(f"   -> Scouting: {topic}...")
-        papers = scout_science.fetch_papers(query, days_back=120)
-        
-        if papers:
-            top_paper = papers[0] 
-            dossier_lines.append(f"Topic:    {topic}")
-            dossier_lines.append(f"Headline: {top_paper['Headline']}")
-            dossier_lines.append(f"Source:   {top_paper['Journal']} ({top_paper['Date']})")
-            dossier_lines.append(f"Insight:  {top_paper['Abstract_Snippet']}")
-            dossier_lines.append(f"Link:     {top_paper['URL']}")
-            dossier_lines.append("")
-        else:
-            print(f"      (No papers found for {topic})")
-            dossier_lines.append(f"Topic: {topic} - No high-confidence signal today.\n")
+DEFAULT_OUTPUT = "Daily_Dossier.txt"
 
-    dossier_lines.append("")
+def generate_dossier(
+    db_path=DEFAULT_DB_PATH,
+    output=DEFAULT_OUTPUT,
+    fmt=None,
+    per_topic=1,
+    queries_path=None,
+    as_of=None,
+):
+    """
+    Writes the dossier from what ccp_ingest has stored: no API calls, so it is
+    fast and gives the same answer every time for the same database.
+    output "-" writes to stdout; fmt defaults from output's extension.
+    """
+    started = time.perf_counter()
+    fmt = fmt or FORMAT_EXTENSIONS.get(os.path.splitext(output)[1].lower(), "text")
+    to_stdout = output == "-"
+    log = sys.stderr if to_stdout else sys.stdout
 
-    # ---------------------------------------------------------
-    # SECTION 2: THE HUMAN PREDICAMENT (Irony Scout)
-    # ---------------------------------------------------------
-    print("🎭 Step 2: Querying Societal Paradox Vector...")
-    irony_queries = {
-        "The Tech Trap": '"Artificial Intelligence" (risk OR error)',
-        "The Expensive Failure": 'budget (waste OR cost OR delay)',
-        "The Green Dilemma": 'environment (problem OR crisis)'
-    }
-    
-    dossier_lines.append("SECTION II: THE HUMAN PREDICAMENT (Society)")
-    dossier_lines.append("-" * 40)
-    
-    for theme, query in irony_queries.items():
-        print(f"   -> Scouting: {theme}...")
-        stories = scout_irony.fetch_irony(query, theme)
-        
-        if stories:
-            top_story = stories[0] 
-            dossier_lines.append(f"Theme:    {theme}")
-            dossier_lines.append(f"Headline: {top_story['Headline']}")
-            dossier_lines.append(f"Tone:     {top_story['Tone_Score']} (Signal)")
-            dossier_lines.append(f"Link:     {top_story['URL']}")
-            dossier_lines.append("")
-        else:
-            print(f"      (No stories found for {theme})")
-            dossier_lines.append(f"Theme: {theme} - No high-confidence signal today.\n")
+    print("🚀 LAUNCHING CONSCIOUS CURATION PIPELINE...\n", file=log)
+
+    # 1. READ THE TOPICS (same registry as ccp_ingest) AND RANK WHAT IS STORED
+    registry = load_queries(queries_path)
+    init_db(db_path)
+    sections = build_dossier(registry, db_path=db_path, per_topic=per_topic, as_of=as_of)
+    for section in sections:
+        for topic, items in section.topics:
+            if not items:
+                print(f"      (Nothing stored for {topic})", file=log)
+
+    # 2. STREAM IT OUT, chunk by chunk
+    day = (as_of or datetime.now()).strftime("%Y-%m-%d")
+    chunks = render_dossier(sections, fmt, day)
+    if to_stdout:
+        sys.stdout.writelines(chunks)
+        sys.stdout.flush()
+        print(f"✅ Dossier rendered in {(time.perf_counter() - started) * 1000:.0f} ms", file=log)
+        return None
 
-    # ---------------------------------------------------------
-    # FINAL: SAVE TO DISK WITH DIAGNOSTICS
-    # ---------------------------------------------------------
-    final_text = "\n".join(dossier_lines)
-    
-    filename = "Daily_Dossier.txt"
-    
     # Get the ABSOLUTE path so there is no confusion where it went
-    full_path = os.path.abspath(filename) 
-    
+    full_path = os.path.abspath(output)
+
     with open(full_path, "w", encoding="utf-8") as f:
-        f.write(final_text)
+        f.writelines(chunks)
         f.flush() # Force write to disk
         os.fsync(f.fileno()) # Force OS to confirm write
-        
+
     print("\n" + "="*60)
-    print(f"✅ SUCCESS!")
+    print(f"✅ SUCCESS! ({(time.perf_counter() - started) * 1000:.0f} ms)")
     print(f"📄 FILE SAVED AT: {full_path}")
     print("="*60)
 
@@ -99,6 +66,24 @@ def generate_dossier():
         print("   (System confirms file exists on disk)")
     else:
         print("   (WARNING: System cannot find the file after writing!)")
+    return full_path
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Write the daily dossier from the items ccp_ingest.py has stored (no API calls)."
+    )
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output file, or - for stdout.")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Output format (default: from the --output extension, else text).",
+    )
+    parser.add_argument("--per-topic", type=int, default=1, help="Items listed per topic.")
+    parser.add_argument("--queries", help="Query registry JSON file (default: queries.json).")
+    return parser
+
 
 if __name__ == "__main__":
-    generate_dossier()
\ No newline at end of file
+    args = build_parser().parse_args()
+    generate_dossier(args.db_path, args.output, args.format, args.per_topic, args.queries)
@@ -0,0 +1,119 @@
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, List, NamedTuple, Optional, TypeVar
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Upper bound on one /debug/profile capture, so a typo cannot pin a thread for hours.
+MAX_PROFILE_SECONDS = 60.0
+DEFAULT_PROFILE_KEEP = 20
+# Lines of pstats output kept per request profile.
+PROFILE_STATS_LINES = 40
+
+T = TypeVar("T")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(
+    seconds: float,
+    interval: float = DEFAULT_SAMPLE_INTERVAL,
+    exclude_threads: Iterable[int] = (),
+) -> Counter:
+    """
+    Sample every thread's Python stack for seconds and count identical stacks.
+    Keys are collapsed stacks, root first: "thread;file:function;...".
+    """
+    excluded = set(exclude_threads) | {threading.get_ident()}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in excluded:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def render_collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's collapsed format ("frame;frame;frame count"), as flamegraph.pl and speedscope read it."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class RequestProfile(NamedTuple):
+    seconds: float
+    label: str
+    started_at: float
+    stats: str
+
+
+class RequestProfiler:
+    """
+    cProfiles a random fraction of calls and keeps the slowest keep profiles.
+    Only one call is profiled at a time; others picked meanwhile run normally.
+    """
+
+    def __init__(self, fraction: float, keep: int = DEFAULT_PROFILE_KEEP) -> None:
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1, got {keep}")
+        self.fraction = fraction
+        self.keep = keep
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    def run(self, label: str, func: Callable[[], T]) -> T:
+        if random.random() >= self.fraction or not self._active.acquire(blocking=False):
+            return func()
+        profiler = cProfile.Profile()
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                return func()
+            finally:
+                profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - started
+            self._active.release()
+            self._record(RequestProfile(elapsed, label, started_at, self._format(profiler)))
+
+    @staticmethod
+    def _format(profiler: cProfile.Profile) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats("cumulative").print_stats(PROFILE_STATS_LINES)
+        return output.getvalue()
+
+    def _record(self, profile: RequestProfile) -> None:
+        entry = (profile.seconds, next(self._order), profile)
+        with self._lock:
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self, limit: Optional[int] = None) -> List[RequestProfile]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [profile for _, _, profile in entries[:limit]]
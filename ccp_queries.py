@@ -0,0 +1,359 @@
+import json
+import math
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_QUERIES_PATH = os.environ.get(
+    "CCP_QUERIES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "queries.json"),
+)
+SOURCES = ("science", "irony")
+
+# Topics folded into one API request, and the longest combined query sent.
+# GDELT rejects long queries outright; OpenAlex only needs the URL to fit.
+MAX_TOPICS_PER_REQUEST = {"science": 8, "irony": 8}
+MAX_QUERY_CHARS = {"science": 1500, "irony": 400}
+# Yield assumed for every topic on top of its measured one, so a topic that
+# has gone quiet still climbs the queue as it goes stale.
+PRIOR_YIELD = 1.0
+
+Registry = Dict[str, Dict[str, str]]
+
+
+def load_queries(path: Optional[str] = None) -> Registry:
+    """
+    Read the query registry: {"science": {topic: query}, "irony": {topic: query}}.
+    Every query is parsed up front, so a typo fails the run before any request.
+    """
+    path = path or DEFAULT_QUERIES_PATH
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    if not isinstance(data, dict) or not set(data) <= set(SOURCES):
+        raise ValueError(f"{path}: expected an object with keys among {', '.join(SOURCES)}")
+    registry: Registry = {}
+    for source in SOURCES:
+        topics = data.get(source) or {}
+        if not isinstance(topics, dict):
+            raise ValueError(f"{path}: {source} must map topic names to queries")
+        for topic, query in topics.items():
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError(f"{path}: {source}/{topic} needs a non-empty query string")
+            try:
+                parse_query(query)
+            except ValueError as exc:
+                raise ValueError(f"{path}: {source}/{topic}: {exc}") from None
+        registry[source] = dict(topics)
+    return registry
+
+
+# --- Boolean queries -------------------------------------------------------
+#
+# The subset of syntax OpenAlex and GDELT share: words, "quoted phrases",
+# AND / OR / NOT (or a leading -), parentheses, and juxtaposition as AND.
+# Parsed trees are nested tuples: ("term", words, text), ("not", node),
+# ("and", children) and ("or", children). A term with no words (GDELT's
+# field operators such as sourcelang:eng) always matches.
+
+_TOKEN = re.compile(r'"([^"]*)"|([()])|([^\s()"]+)')
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+def _tokenize(query: str) -> List[Any]:
+    tokens: List[Any] = []
+    for match in _TOKEN.finditer(query):
+        phrase, paren, word = match.groups()
+        if paren:
+            tokens.append(paren)
+        elif word in _OPERATORS:
+            tokens.append(word)
+        else:
+            text = match.group(0)
+            if word and word.startswith("-") and len(word) > 1:
+                tokens.append("NOT")
+                text = word = word[1:]
+            words = () if word and ":" in word else tuple(re.findall(r"\w+", (phrase or word or "").lower()))
+            if words or ":" in (word or ""):
+                tokens.append(("term", words, text))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.tokens = _tokenize(query)
+        self.position = 0
+
+    def _peek(self) -> Any:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self) -> Any:
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise ValueError(f"no search terms in {self.query!r}")
+        node = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"unexpected {self._peek()!r} in {self.query!r}")
+        return node
+
+    def _or(self) -> tuple:
+        children = [self._and()]
+        while self._peek() == "OR":
+            self._take()
+            children.append(self._and())
+        return children[0] if len(children) == 1 else ("or", tuple(children))
+
+    def _and(self) -> tuple:
+        children = [self._unary()]
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self._take()
+            children.append(self._unary())
+        return children[0] if len(children) == 1 else ("and", tuple(children))
+
+    def _unary(self) -> tuple:
+        token = self._take()
+        if token == "NOT":
+            return ("not", self._unary())
+        if token == "(":
+            node = self._or()
+            if self._take() != ")":
+                raise ValueError(f"unbalanced parentheses in {self.query!r}")
+            return node
+        if isinstance(token, tuple):
+            return token
+        raise ValueError(f"unexpected {token!r} in {self.query!r}")
+
+
+def parse_query(query: str) -> tuple:
+    return _Parser(query).parse()
+
+
+def _term_pattern(words: Tuple[str, ...]) -> "re.Pattern":
+    # Word-prefix match, so "signal" also finds "signaling" the way both
+    # APIs' stemming would.
+    return re.compile(r"\b" + r"\w*\W+".join(map(re.escape, words)))
+
+
+class QueryMatcher:
+    """Evaluates a query locally against lowercased text."""
+
+    def __init__(self, query: str) -> None:
+        self.tree = parse_query(query)
+        self._patterns: Dict[Tuple[str, ...], "re.Pattern"] = {}
+        self._positive = self._positive_terms(self.tree)
+
+    def _pattern(self, words: Tuple[str, ...]) -> "re.Pattern":
+        pattern = self._patterns.get(words)
+        if pattern is None:
+            pattern = self._patterns[words] = _term_pattern(words)
+        return pattern
+
+    def _positive_terms(self, node: tuple) -> List[Tuple[str, ...]]:
+        kind = node[0]
+        if kind == "term":
+            return [node[1]] if node[1] else []
+        if kind == "not":
+            return []
+        return [words for child in node[1] for words in self._positive_terms(child)]
+
+    def _evaluate(self, node: tuple, text: str) -> bool:
+        kind = node[0]
+        if kind == "term":
+            return not node[1] or self._pattern(node[1]).search(text) is not None
+        if kind == "not":
+            return not self._evaluate(node[1], text)
+        if kind == "and":
+            return all(self._evaluate(child, text) for child in node[1])
+        return any(self._evaluate(child, text) for child in node[1])
+
+    def matches(self, text: str) -> bool:
+        return self._evaluate(self.tree, text)
+
+    def score(self, text: str) -> int:
+        """How many of the query's (non-negated) terms occur in text."""
+        return sum(self._pattern(words).search(text) is not None for words in self._positive)
+
+
+@lru_cache(maxsize=4096)
+def matcher_for(query: str) -> QueryMatcher:
+    return QueryMatcher(query)
+
+
+def _flat_clauses(node: tuple) -> Optional[List[Tuple[str, ...]]]:
+    """
+    The query as an AND of flat OR-groups (the only nesting GDELT accepts),
+    each group a tuple of term texts; None if it does not have that shape.
+    """
+    def group(child: tuple) -> Optional[Tuple[str, ...]]:
+        if child[0] == "term":
+            return (child[2],)
+        if child[0] == "or" and all(grandchild[0] == "term" for grandchild in child[1]):
+            return tuple(grandchild[2] for grandchild in child[1])
+        return None
+
+    children = node[1] if node[0] == "and" else (node,)
+    clauses = [group(child) for child in children]
+    return None if any(clause is None for clause in clauses) else clauses
+
+
+def _or_group(texts: Sequence[str]) -> str:
+    return texts[0] if len(texts) == 1 else "(" + " OR ".join(texts) + ")"
+
+
+# --- Planning --------------------------------------------------------------
+
+
+class Topic(NamedTuple):
+    source: str
+    topic: str
+    query: str
+
+
+class PlannedRequest(NamedTuple):
+    """One API call covering one or more topics."""
+
+    source: str
+    query: str
+    topics: Tuple[Topic, ...]
+
+    @property
+    def label(self) -> str:
+        extra = len(self.topics) - 1
+        return self.topics[0].topic + (f" +{extra}" if extra else "")
+
+    def claim(self, text: str) -> List[Topic]:
+        """
+        The topics that claim a result: every topic whose own query matches
+        text, else those sharing the most terms with it, else none.
+        """
+        if len(self.topics) == 1:
+            return list(self.topics)
+        text = text.lower()
+        matched = [topic for topic in self.topics if matcher_for(topic.query).matches(text)]
+        if matched:
+            return matched
+        scores = [matcher_for(topic.query).score(text) for topic in self.topics]
+        best = max(scores)
+        return [topic for topic, score in zip(self.topics, scores) if best and score == best]
+
+
+def registry_topics(registry: Registry, source: str) -> List[Topic]:
+    return [Topic(source, topic, query) for topic, query in registry.get(source, {}).items()]
+
+
+def topic_priority(stats: Optional[Mapping[str, Any]], now: Optional[datetime] = None) -> float:
+    """
+    Expected new results if the topic ran now: its smoothed yield per run
+    (plus PRIOR_YIELD) times the hours since it last ran. Topics that have
+    never run come first.
+    """
+    if not stats or not stats.get("runs"):
+        return math.inf
+    try:
+        last_run = datetime.fromisoformat(stats["last_success_at"])
+    except (KeyError, TypeError, ValueError):
+        return math.inf
+    hours = ((now or datetime.utcnow()) - last_run).total_seconds() / 3600
+    return ((stats.get("yield_ema") or 0.0) + PRIOR_YIELD) * max(hours, 1 / 60)
+
+
+def _merge_science(topics: List[Topic]) -> List[List[Topic]]:
+    # OpenAlex takes arbitrary nesting, so any topics combine as (q1) OR (q2).
+    groups: List[List[Topic]] = []
+    length = 0
+    for topic in topics:
+        cost = len(topic.query) + 6
+        if groups and len(groups[-1]) < MAX_TOPICS_PER_REQUEST["science"] and length + cost <= MAX_QUERY_CHARS["science"]:
+            groups[-1].append(topic)
+            length += cost
+        else:
+            groups.append([topic])
+            length = cost
+    return groups
+
+
+def _science_query(topics: Sequence[Topic]) -> str:
+    if len(topics) == 1:
+        return topics[0].query
+    return " OR ".join(f"({topic.query})" for topic in topics)
+
+
+def _gdelt_shape(query: str) -> Optional[Tuple[Tuple[Tuple[str, ...], ...], Tuple[str, ...]]]:
+    """
+    Split a GDELT query into its fixed clauses and the one OR-group that can
+    absorb other topics' terms: '"AI" (risk OR error)' -> (('"AI"',),), ('risk', 'error').
+    """
+    clauses = _flat_clauses(parse_query(query))
+    if not clauses:
+        return None
+    varying = max((index for index, clause in enumerate(clauses) if len(clause) > 1), default=len(clauses) - 1)
+    return tuple(clauses[:varying] + clauses[varying + 1:]), clauses[varying]
+
+
+def _gdelt_query(fixed: Tuple[Tuple[str, ...], ...], terms: Sequence[str]) -> str:
+    return " ".join([_or_group(clause) for clause in fixed] + [_or_group(terms)])
+
+
+def _merge_irony(topics: List[Topic]) -> List[Tuple[List[Topic], str]]:
+    # GDELT accepts no nested parentheses, so only topics that differ in a
+    # single OR-group fold together: "X (a OR b)" + "X (c)" -> "X (a OR b OR c)".
+    open_groups: Dict[Any, Tuple[List[Topic], List[str]]] = {}
+    requests: List[Tuple[List[Topic], List[str], Any]] = []
+    for topic in topics:
+        shape = _gdelt_shape(topic.query)
+        if shape is None:
+            requests.append(([topic], [], None))
+            continue
+        fixed, terms = shape
+        current = open_groups.get(fixed)
+        if current is not None:
+            members, merged_terms = current
+            combined = merged_terms + [term for term in terms if term not in merged_terms]
+            if (
+                len(members) < MAX_TOPICS_PER_REQUEST["irony"]
+                and len(_gdelt_query(fixed, combined)) <= MAX_QUERY_CHARS["irony"]
+            ):
+                members.append(topic)
+                merged_terms[:] = combined
+                continue
+        members, merged_terms = [topic], list(terms)
+        open_groups[fixed] = (members, merged_terms)
+        requests.append((members, merged_terms, fixed))
+    return [
+        (members, members[0].query if len(members) == 1 else _gdelt_query(fixed, terms))
+        for members, terms, fixed in requests
+    ]
+
+
+def plan_requests(
+    topics: Sequence[Topic],
+    stats: Optional[Mapping[Tuple[str, str, str], Mapping[str, Any]]] = None,
+    max_requests: Optional[int] = None,
+    merge: bool = True,
+    now: Optional[datetime] = None,
+) -> List[PlannedRequest]:
+    """
+    Group one source's topics into as few requests as the API's syntax allows,
+    highest-priority topics first. stats are the topics' watermark rows (see
+    ccp_storage.list_watermarks); with max_requests, only that many of the
+    most valuable requests are returned and the rest wait for a later run.
+    """
+    if not topics:
+        return []
+    stats = stats or {}
+    ordered = sorted(topics, key=lambda topic: -topic_priority(stats.get(tuple(topic)), now))
+    source = ordered[0].source
+    if not merge:
+        planned = [PlannedRequest(source, topic.query, (topic,)) for topic in ordered]
+    elif source == "science":
+        planned = [PlannedRequest(source, _science_query(group), tuple(group)) for group in _merge_science(ordered)]
+    else:
+        planned = [PlannedRequest(source, query, tuple(group)) for group, query in _merge_irony(ordered)]
+    return planned[:max_requests] if max_requests else planned
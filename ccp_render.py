@@ -0,0 +1,306 @@
+import html
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from ccp_metrics import CACHE_LOOKUPS
+
+# Rendered item fragments kept in memory (roughly 1 KB each).
+DEFAULT_FRAGMENT_CACHE_SIZE = 50_000
+
+FILTERS = (
+    ("All", None),
+    ("Science", "science"),
+    ("Society", "society"),
+)
+
+EMPTY_FEED_MESSAGE = '<p class="empty">No items yet. Run the ingest job.</p>'
+EMPTY_SEARCH_MESSAGE = "<p>No items match your search.</p>"
+
+STYLE = """
+  body {
+    font-family: "Inter", Arial, sans-serif;
+    margin: 0;
+    padding: 24px;
+    background: #0f172a;
+    color: #e2e8f0;
+  }
+  header {
+    display: flex;
+    justify-content: space-between;
+    align-items: baseline;
+    flex-wrap: wrap;
+    gap: 12px;
+  }
+  h1 {
+    margin: 0;
+    font-size: 24px;
+  }
+  .filters {
+    display: flex;
+    gap: 8px;
+    flex-wrap: wrap;
+  }
+  .filter {
+    color: #94a3b8;
+    text-decoration: none;
+    border: 1px solid #334155;
+    padding: 6px 10px;
+    border-radius: 6px;
+  }
+  .item {
+    background: #111827;
+    border: 1px solid #1f2937;
+    border-radius: 12px;
+    padding: 16px;
+    margin-top: 16px;
+  }
+  .meta {
+    font-size: 12px;
+    text-transform: uppercase;
+    display: flex;
+    gap: 8px;
+    flex-wrap: wrap;
+  }
+  .badge {
+    background: #2563eb;
+    color: white;
+    padding: 2px 6px;
+    border-radius: 999px;
+    font-weight: 600;
+  }
+  .summary {
+    color: #cbd5f5;
+    font-size: 14px;
+  }
+  .links {
+    display: flex;
+    gap: 12px;
+    align-items: center;
+    flex-wrap: wrap;
+  }
+  .links a {
+    color: #38bdf8;
+    text-decoration: none;
+  }
+  .copy {
+    background: #1d4ed8;
+    border: none;
+    color: white;
+    padding: 6px 12px;
+    border-radius: 6px;
+    cursor: pointer;
+  }
+  .tone {
+    color: #fbbf24;
+    font-size: 12px;
+  }
+  .similar {
+    color: #94a3b8;
+  }
+  .search input {
+    background: #111827;
+    color: #e2e8f0;
+    border: 1px solid #334155;
+    padding: 6px 10px;
+    border-radius: 6px;
+  }
+  mark {
+    background: #fbbf24;
+    color: #0f172a;
+  }
+"""
+
+# The feed page subscribes to /api/stream (see ccp_stream) and adds new items
+# in place: cluster founders go on top, near-duplicates bump the "+N similar"
+# count of whichever member of their cluster is shown, and a reset event (too far behind) reloads the page.
+SCRIPT = """
+  const bindCopy = (root) => {
+    root.querySelectorAll(".copy").forEach((button) => {
+      button.addEventListener("click", () => {
+        navigator.clipboard.writeText(button.dataset.copy || "");
+        button.textContent = "Copied!";
+        setTimeout(() => (button.textContent = "Copy"), 1200);
+      });
+    });
+  };
+  bindCopy(document);
+
+  const feed = document.querySelector("main[data-stream]");
+  if (feed && window.EventSource) {
+    const shown = (id) => feed.querySelector(`.item[data-id="${CSS.escape(id)}"]`);
+    const shownCluster = (id) => feed.querySelector(`.item[data-cluster="${CSS.escape(id)}"]`);
+    const events = new EventSource(feed.dataset.stream);
+    events.addEventListener("item", (event) => {
+      const item = JSON.parse(event.data);
+      if (item.cluster_id !== item.id) {
+        const member = shownCluster(item.cluster_id);
+        if (member) {
+          let similar = member.querySelector(".similar");
+          if (!similar) {
+            similar = document.createElement("span");
+            similar.className = "similar";
+            similar.dataset.count = "0";
+            member.querySelector(".meta").appendChild(similar);
+          }
+          similar.dataset.count = Number(similar.dataset.count) + 1;
+          similar.textContent = `+${similar.dataset.count} similar`;
+        }
+        return;
+      }
+      if (shown(item.id)) return;
+      feed.querySelector(".empty")?.remove();
+      feed.insertAdjacentHTML("afterbegin", item.html);
+      bindCopy(feed.firstElementChild);
+      const items = feed.querySelectorAll(".item");
+      for (let index = Number(feed.dataset.limit); index < items.length; index++) items[index].remove();
+      document.querySelector(".updated").textContent =
+        "Updated " + new Date().toISOString().slice(0, 16).replace("T", " ") + " UTC";
+    });
+    events.addEventListener("reset", () => location.reload());
+  }
+"""
+
+# Everything that does not depend on the request is assembled once, at import.
+PAGE_HEAD = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8" />
+<meta name="viewport" content="width=device-width, initial-scale=1" />
+<title>Conscious Curation Pipeline</title>
+<style>{STYLE}</style>
+</head>
+<body>
+"""
+PAGE_TAIL = f"""
+<script>{SCRIPT}</script>
+</body>
+</html>
+"""
+FILTER_LINKS = " ".join(
+    f'<a class="filter" href="/?type={value}">{label}</a>' if value else '<a class="filter" href="/">All</a>'
+    for label, value in FILTERS
+)
+
+
+def _escape(value: Any) -> str:
+    return html.escape(str(value)) if value is not None else ""
+
+
+def _safe_url(url: Optional[str]) -> str:
+    # Only link out to web URLs; anything else (javascript:, data:, "No URL") becomes "#".
+    if url and url.lower().startswith(("http://", "https://")):
+        return html.escape(url)
+    return "#"
+
+
+def render_item(item: Dict[str, Any]) -> str:
+    """HTML fragment for one item. headline_highlight/summary_snippet, when present, are already HTML-safe."""
+    summary = item.get("summary") or ""
+    tone = item.get("tone")
+    tone_display = f"{tone:.2f}" if isinstance(tone, (float, int)) else ""
+    similar = (item.get("cluster_size") or 1) - 1
+    similar_html = f'<span class="similar" data-count="{similar}">+{similar} similar</span>' if similar > 0 else ""
+    headline_html = item.get("headline_highlight") or _escape(item["headline"])
+    summary_html = item.get("summary_snippet") or _escape(summary)
+    copy_text = f"{item['headline']} — {summary} {item.get('url') or ''}"
+    return f"""
+<div class="item" data-id="{_escape(item['id'])}" data-cluster="{_escape(item.get('cluster_id') or item['id'])}">
+  <div class="meta">
+    <span class="badge">{_escape(item['item_type'].upper())}</span>
+    <span class="topic">{_escape(item['topic'])}</span>
+    <span class="source">{_escape(item['source'])}</span>
+    <span class="date">{_escape(item.get('published_date'))}</span>
+    {similar_html}
+  </div>
+  <h3>{headline_html}</h3>
+  <p class="summary">{summary_html}</p>
+  <div class="links">
+    <a href="{_safe_url(item.get('url'))}" target="_blank" rel="noreferrer">Open source</a>
+    <button class="copy" data-copy="{_escape(copy_text)}">Copy</button>
+    <span class="tone">{tone_display}</span>
+  </div>
+</div>
+"""
+
+
+def _fragment_stamp(item: Dict[str, Any]) -> tuple:
+    return item.get("summary"), item.get("tone"), item.get("cluster_size")
+
+
+class FragmentCache:
+    """
+    Rendered item fragments by id. Items are immutable after insert apart from
+    summary/tone (upserts) and their near-duplicate count, so those are stored
+    alongside each fragment and a change re-renders it.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_FRAGMENT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render_all(self, items: Iterable[Dict[str, Any]]) -> List[str]:
+        items = list(items)
+        fragments: List[Optional[str]] = [None] * len(items)
+        misses = []
+        with self._lock:
+            for index, item in enumerate(items):
+                entry = self._entries.get(item["id"])
+                if entry is not None and entry[0] == _fragment_stamp(item):
+                    self._entries.move_to_end(item["id"])
+                    fragments[index] = entry[1]
+                else:
+                    misses.append(index)
+
+        CACHE_LOOKUPS.inc(len(items) - len(misses), cache="fragment", result="hit")
+        CACHE_LOOKUPS.inc(len(misses), cache="fragment", result="miss")
+        rendered = []
+        for index in misses:
+            item = items[index]
+            fragment = render_item(item)
+            fragments[index] = fragment
+            rendered.append((item["id"], _fragment_stamp(item), fragment))
+
+        if rendered:
+            with self._lock:
+                for item_id, stamp, fragment in rendered:
+                    self._entries[item_id] = (stamp, fragment)
+                    self._entries.move_to_end(item_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return fragments
+
+
+def render_page(
+    items: Iterable[Dict[str, Any]],
+    now: str,
+    search: Optional[str] = None,
+    cache: Optional[FragmentCache] = None,
+    stream_url: Optional[str] = None,
+    stream_limit: int = 200,
+) -> str:
+    """
+    The full feed page: the prebuilt shell around one fragment per item.
+    Search results carry per-query highlights, so they bypass the cache.
+    With stream_url, new items from that /api/stream URL are added on top,
+    keeping at most stream_limit on the page.
+    """
+    if cache is not None and not search:
+        fragments = cache.render_all(items)
+    else:
+        fragments = [render_item(item) for item in items]
+    empty_message = EMPTY_SEARCH_MESSAGE if search else EMPTY_FEED_MESSAGE
+    header = f"""<header>
+  <div>
+    <h1>Conscious Curation Pipeline</h1>
+    <p class="updated">Updated {_escape(now)}</p>
+  </div>
+  <div class="filters">{FILTER_LINKS}</div>
+  <form class="search" action="/" method="get">
+    <input type="search" name="q" value="{_escape(search or '')}" placeholder="Search headlines and summaries" />
+  </form>
+</header>
+"""
+    main = f'<main data-stream="{_escape(stream_url)}" data-limit="{stream_limit}">' if stream_url else "<main>"
+    return "".join((PAGE_HEAD, header, main, "\n", "".join(fragments) or empty_message, "\n</main>", PAGE_TAIL))
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Each run is moved by up to this fraction of its interval, so jobs that
+# share an interval drift apart instead of firing together forever.
+DEFAULT_JITTER = 0.1
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        run: Callable[[], None],
+        group: str = "default",
+    ) -> None:
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.group = group
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+
+
+class Scheduler:
+    """
+    Runs jobs repeatedly, each on its own interval. Every job group gets its
+    own small thread pool, so a group of slow jobs cannot starve another.
+
+    The first run of every job lands somewhere in its first jitter window, and
+    later runs are interval +/- jitter apart. A job that is still running when
+    it comes due again is skipped for that slot rather than queued, so a slow
+    API never builds a backlog. stop() (safe from a signal handler) stops
+    dispatching; run_forever() then waits for in-flight jobs and returns.
+    """
+
+    def __init__(
+        self,
+        jobs: List[Job],
+        group_workers: Optional[Dict[str, int]] = None,
+        jitter: float = DEFAULT_JITTER,
+    ) -> None:
+        self.jobs = jobs
+        self.jitter = jitter
+        group_workers = group_workers or {}
+        self._pools = {
+            group: ThreadPoolExecutor(max_workers=max(1, group_workers.get(group, 1)), thread_name_prefix=f"ccp-{group}")
+            for group in {job.group for job in jobs}
+        }
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+        self._queue: List[Tuple[float, int, Job]] = []
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _next_delay(self, job: Job) -> float:
+        return max(0.0, job.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _schedule(self, job: Job, at: float) -> None:
+        heapq.heappush(self._queue, (at, next(self._order), job))
+
+    def _execute(self, job: Job) -> None:
+        try:
+            # A run that sat in its pool's queue past stop() is dropped.
+            if not self.stopping:
+                job.run()
+        except Exception as exc:  # a failing job must not kill the daemon
+            job.failures += 1
+            print(f"Scheduled job {job.name} failed: {exc}")
+        finally:
+            with self._lock:
+                job.running = False
+
+    def run_forever(self) -> None:
+        if not self.jobs:
+            print("Scheduler has no jobs to run")
+            return
+        now = time.monotonic()
+        for job in self.jobs:
+            self._schedule(job, now + random.uniform(0, job.interval * self.jitter))
+        try:
+            while not self._stop.is_set():
+                at, _, job = self._queue[0]
+                if self._stop.wait(max(0.0, at - time.monotonic())):
+                    break
+                heapq.heappop(self._queue)
+                with self._lock:
+                    overlapping = job.running
+                    job.running = True
+                if overlapping:
+                    job.skipped += 1
+                    print(f"Skipping {job.name}: previous run still in progress")
+                else:
+                    job.runs += 1
+                    self._pools[job.group].submit(self._execute, job)
+                self._schedule(job, time.monotonic() + self._next_delay(job))
+        finally:
+            self._stop.set()
+            for pool in self._pools.values():
+                pool.shutdown(wait=True)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {job.name: {"runs": job.runs, "skipped": job.skipped, "failures": job.failures} for job in self.jobs}
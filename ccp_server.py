@@ -1,200 +1,893 @@
 import argparse
+import csv
+import hashlib
+import hmac
+import io
+import ipaddress
 import json
-from datetime import datetime
+import os
+import signal
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import format_datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Optional
-from urllib.parse import parse_qs, urlparse
+from typing import Callable, Dict, Hashable, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
 
-from ccp_storage import DEFAULT_DB_PATH, init_db, list_items
+from ccp_hot import DEFAULT_HOT_ITEMS, HotIndex
+from ccp_metrics import CACHE_LOOKUPS, DEFAULT_SIZE_BUCKETS, REGISTRY
+from ccp_profiling import (
+    DEFAULT_PROFILE_KEEP,
+    DEFAULT_SAMPLE_INTERVAL,
+    MAX_PROFILE_SECONDS,
+    RequestProfiler,
+    render_collapsed,
+    sample_stacks,
+)
+from ccp_render import FragmentCache, render_item, render_page
+from ccp_storage import (
+    DEFAULT_DB_PATH,
+    ITEM_COLUMNS,
+    MAX_PAGE_SIZE,
+    DataVersionWatcher,
+    ReadConnectionManager,
+    cluster_sizes,
+    decode_cursor,
+    encode_cursor,
+    facet_counts,
+    get_connection,
+    get_item,
+    init_db,
+    iter_item_rows,
+    latest_created_at,
+    list_items,
+    list_items_page,
+    max_item_rowid,
+    search_items,
+    top_items,
+)
+from ccp_stream import DEFAULT_MAX_SUBSCRIBERS, DEFAULT_POLL_INTERVAL, RETRY_MILLISECONDS, ItemStream
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_CONNECTIONS = 64
+# Idle keep-alive connections (and slow clients) are dropped after this many seconds.
+KEEP_ALIVE_TIMEOUT = 15
+DEFAULT_CACHE_ENTRIES = 256
+# Items rendered on the HTML page.
+INDEX_LIMIT = 200
+# /api/items query parameters passed through to list_items (URL name -> argument name).
+ITEM_FILTERS = {
+    "type": "item_type",
+    "topic": "topic",
+    "source": "source",
+    "since": "since",
+    "until": "until",
+    "cursor": "cursor",
+}
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+# Items per topic returned by /api/top unless ?limit= says otherwise.
+DEFAULT_TOP_LIMIT = 10
+# Export rows are buffered into chunks of roughly this size before being written.
+EXPORT_CHUNK_BYTES = 64 * 1024
+# Headers a reverse proxy adds; their presence means the peer address is the proxy's.
+PROXY_HEADERS = ("Forwarded", "X-Forwarded-For", "X-Real-IP")
+
+# Route labels for metrics; any other path is counted as "other" so stray
+# URLs cannot blow up the number of series.
+ROUTES = (
+    "/",
+    "/api/items",
+    "/api/items/{id}",
+    "/api/export",
+    "/api/search",
+    "/api/top",
+    "/api/facets",
+    "/api/stream",
+    "/metrics",
+    "/debug/profile",
+    "/debug/requests",
+)
+
+HTTP_REQUESTS = REGISTRY.counter("ccp_http_requests_total", "Requests handled, by route and status.", ("route", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "ccp_http_request_seconds",
+    "Time from parsed request to response written, by route.",
+    ("route",),
+)
+HTTP_RESPONSE_BYTES = REGISTRY.histogram(
+    "ccp_http_response_bytes",
+    "Response body size, by route.",
+    ("route",),
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+HTTP_REJECTED = REGISTRY.counter("ccp_http_rejected_total", "Connections answered 503 because the server was full.")
+RENDER_SECONDS = REGISTRY.histogram(
+    "ccp_render_seconds",
+    "Time spent building response bodies (queries plus rendering) on cache misses, by route.",
+    ("route",),
+)
+
+
+# One stack-sampling capture at a time; each one occupies a worker for its duration.
+_PROFILE_LOCK = threading.Lock()
+
+
+def _route_label(path: str) -> str:
+    if path.startswith("/api/items/"):
+        return "/api/items/{id}"
+    return path if path in ROUTES else "other"
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    body: bytes
+    content_type: str
+    etag: str
+    last_modified: Optional[str]
+    headers: Tuple[Tuple[str, str], ...]
+
+
+class ResponseCache:
+    """LRU of rendered responses, each tagged with the data_version it was built at."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _http_date(created_at: Optional[str]) -> Optional[str]:
+    if not created_at:
+        return None
+    try:
+        moment = datetime.fromisoformat(created_at)
+    except ValueError:
+        return None
+    return format_datetime(moment.replace(tzinfo=moment.tzinfo or timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix.
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def _accepts_gzip(header: Optional[str]) -> bool:
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _export_lines(rows: Iterable[tuple], export_format: str) -> Iterator[str]:
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ITEM_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(ITEM_COLUMNS, row))) + "\n"
+
+
+def _buffered(lines: Iterable[str], size: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    pending = []
+    pending_bytes = 0
+    for line in lines:
+        encoded = line.encode("utf-8")
+        pending.append(encoded)
+        pending_bytes += len(encoded)
+        if pending_bytes >= size:
+            yield b"".join(pending)
+            pending = []
+            pending_bytes = 0
+    if pending:
+        yield b"".join(pending)
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
 
 class CCPHandler(BaseHTTPRequestHandler):
     db_path: str = DEFAULT_DB_PATH
+    read_connections: Optional[ReadConnectionManager] = None
+    data_version: Optional[DataVersionWatcher] = None
+    response_cache: Optional[ResponseCache] = None
+    fragment_cache: FragmentCache = FragmentCache()
+    # /debug/* needs this bearer token; without one only loopback clients of a
+    # loopback-bound server get in, and never through a proxy.
+    admin_token: Optional[str] = None
+    request_profiler: Optional[RequestProfiler] = None
+    item_stream: Optional[ItemStream] = None
+    # Newest items in memory; list requests it can answer skip SQLite.
+    hot_index: Optional[HotIndex] = None
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out as separate writes; with Nagle on, a keep-alive
+    # client's delayed ACK stalls every response by ~40 ms.
+    disable_nagle_algorithm = True
+    # Per-request bookkeeping for metrics, reset in do_GET.
+    _route = "other"
+    _status = 500
+    _response_bytes = 0
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        self._status = code
+        super().send_response(code, message)
 
-    def _send_response(self, content: str, status: int = 200, content_type: str = "text/html") -> None:
-        encoded = content.encode("utf-8")
+    def end_headers(self) -> None:
+        # While the server drains, finish the current request but not the connection.
+        if getattr(self.server, "draining", False):
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        super().end_headers()
+
+    def _read_connection(self):
+        return self.read_connections.get() if self.read_connections else None
+
+    def _list_items(self, limit: int, item_type: Optional[str], collapse: bool = False):
+        return list_items(
+            db_path=self.db_path,
+            limit=limit,
+            item_type=item_type,
+            conn=self._read_connection(),
+            collapse=collapse,
+        )
+
+    def _hot_items(self, limit: int, **arguments):
+        """Up to limit items from the hot index, or None when SQLite has to answer."""
+        if self.hot_index is None:
+            return None
+        self.hot_index.refresh()
+        return self.hot_index.list_items(limit, **arguments)
+
+    def _latest_created_at(self) -> Optional[str]:
+        if self.hot_index is not None:
+            self.hot_index.refresh()
+            if len(self.hot_index):
+                return self.hot_index.latest_created_at()
+        return latest_created_at(self.db_path, conn=self._read_connection())
+
+    def _render_items_page(
+        self,
+        limit: int,
+        filters: Dict[str, str],
+        collapse: bool = False,
+    ) -> Tuple[str, str, Dict[str, str]]:
+        arguments = {ITEM_FILTERS[name]: value for name, value in filters.items()}
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        hot = self._hot_items(limit + 1, collapse=collapse, **arguments)
+        if hot is not None:
+            # Each hot item carries its JSON already; the page is just joined.
+            page = hot[:limit]
+            content = "[" + ", ".join(item.json() for item in page) + "]"
+            next_cursor = None
+            if len(hot) > limit:
+                next_cursor = encode_cursor({"created_at": page[-1].created_at, "id": page[-1].id})
+        else:
+            items, next_cursor = list_items_page(
+                limit=limit,
+                db_path=self.db_path,
+                conn=self._read_connection(),
+                collapse=collapse,
+                **arguments,
+            )
+            content = json.dumps(items)
+        headers = {}
+        if next_cursor:
+            next_query = dict(filters, limit=str(limit), cursor=next_cursor)
+            if collapse:
+                next_query["collapse"] = "1"
+            next_url = f"/api/items?{urlencode(sorted(next_query.items()))}"
+            headers = {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": next_cursor}
+        return content, "application/json", headers
+
+    def _send_response(
+        self,
+        content,
+        status: int = 200,
+        content_type: str = "text/html",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        encoded = content.encode("utf-8") if isinstance(content, str) else content
         self.send_response(status)
         self.send_header("Content-Type", f"{content_type}; charset=utf-8")
         self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(encoded)
+        self._response_bytes += len(encoded)
+
+    def _send_stream(self, chunks: Iterator[bytes], content_type: str, headers: Dict[str, str]) -> None:
+        """Write chunks as they are produced: chunked encoding on HTTP/1.1, close-delimited otherwise."""
+        chunked = self.protocol_version == "HTTP/1.1" and self.request_version == "HTTP/1.1"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+                self._response_bytes += len(chunk)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        finally:
+            # Releases the SQLite cursor even if the client went away mid-export.
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _send_export(self, export_format: str, filters: Dict[str, str]) -> None:
+        arguments = {ITEM_FILTERS[name]: value for name, value in filters.items()}
+        conn = self._read_connection()
+        own_conn = None
+        if conn is None:
+            conn = own_conn = get_connection(self.db_path)
+        try:
+            rows = iter_item_rows(conn, **arguments)
+            chunks = _buffered(_export_lines(rows, export_format))
+            headers = {
+                "Content-Disposition": f'attachment; filename="ccp-items.{export_format}"',
+                "Vary": "Accept-Encoding",
+            }
+            if _accepts_gzip(self.headers.get("Accept-Encoding")):
+                chunks = _gzipped(chunks)
+                headers["Content-Encoding"] = "gzip"
+            self._send_stream(chunks, f"{EXPORT_FORMATS[export_format]}; charset=utf-8", headers)
+        finally:
+            if own_conn is not None:
+                own_conn.close()
+
+    def _send_event_stream(self, query: Dict[str, list]) -> None:
+        """Answer /api/stream, then hand the socket to the shared ItemStream."""
+        if self.item_stream is None:
+            self._send_response("Streaming is off", status=404, content_type="text/plain")
+            return
+        try:
+            # A reconnecting EventSource sends the id of the last event it saw;
+            # ?after= lets a page start from the items it was rendered with.
+            resume = self.headers.get("Last-Event-ID") or query.get("after", [""])[0]
+            after = int(resume) if resume else None
+        except ValueError as exc:
+            self._send_response(str(exc), status=400, content_type="text/plain")
+            return
+        if not self.item_stream.accepting():
+            self._send_response("Busy", status=503, content_type="text/plain", headers={"Retry-After": "5"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        # Stops nginx-style proxies from buffering events.
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(f"retry: {RETRY_MILLISECONDS}\n\n".encode("utf-8"))
+        self.close_connection = True
+        subscribed = self.item_stream.subscribe(
+            self.request,
+            after,
+            item_type=query.get("type", [""])[0] or None,
+            html=query.get("html", ["0"])[0] in ("1", "true"),
+        )
+        if subscribed:
+            self.server.detach(self.request)
+
+    def _send_cached(self, key: Hashable, build: Callable[[], Tuple[str, str, Dict[str, str]]]) -> None:
+        """Serve build()'s (content, content_type, headers), reusing it until the database changes."""
+        if self.response_cache is None or self.data_version is None:
+            with RENDER_SECONDS.time(route=self._route):
+                content, content_type, extra_headers = build()
+            self._send_response(content, content_type=content_type, headers=extra_headers)
+            return
+
+        # Read the version before building: a write that lands mid-build leaves
+        # the entry stale, and the next request rebuilds it.
+        version = self.data_version.current()
+        entry = self.response_cache.get(key, version)
+        CACHE_LOOKUPS.inc(cache="response", result="miss" if entry is None else "hit")
+        if entry is None:
+            with RENDER_SECONDS.time(route=self._route):
+                content, content_type, extra_headers = build()
+            body = content.encode("utf-8")
+            entry = CachedResponse(
+                version=version,
+                body=body,
+                content_type=content_type,
+                etag=f'"{hashlib.sha1(body).hexdigest()}"',
+                last_modified=_http_date(self._latest_created_at()),
+                headers=tuple(extra_headers.items()),
+            )
+            self.response_cache.put(key, entry)
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if entry.last_modified:
+            headers["Last-Modified"] = entry.last_modified
+        headers.update(entry.headers)
+        if _etag_matches(self.headers.get("If-None-Match"), entry.etag):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self._send_response(entry.body, content_type=entry.content_type, headers=headers)
 
     def _parse_query(self):
         parsed = urlparse(self.path)
         return parsed.path, parse_qs(parsed.query)
 
+    def _render_search_page(self, text: str, limit: int, offset: int) -> Tuple[str, str, Dict[str, str]]:
+        items, has_more = search_items(
+            text,
+            db_path=self.db_path,
+            limit=limit,
+            offset=offset,
+            conn=self._read_connection(),
+        )
+        headers = {}
+        if has_more:
+            next_query = {"q": text, "limit": str(limit), "offset": str(offset + limit)}
+            headers = {"Link": f'</api/search?{urlencode(next_query)}>; rel="next"'}
+        return json.dumps(items), "application/json", headers
+
+    def _render_index(self, item_type: Optional[str], search: Optional[str] = None) -> str:
+        stream_url = None
+        if search:
+            items, _ = search_items(search, db_path=self.db_path, limit=INDEX_LIMIT, conn=self._read_connection())
+        else:
+            if self.hot_index is not None:
+                self.hot_index.refresh()
+            if self.item_stream is not None:
+                # Read before the items, so nothing inserted in between is missed;
+                # the page skips items it already shows.
+                if self.hot_index is not None:
+                    newest = self.hot_index.mark
+                else:
+                    newest = max_item_rowid(self.db_path, conn=self._read_connection())
+                stream_query = {"html": "1", "after": str(newest)}
+                if item_type:
+                    stream_query["type"] = item_type
+                stream_url = f"/api/stream?{urlencode(stream_query)}"
+            hot = self._hot_items(INDEX_LIMIT, item_type=item_type, collapse=True)
+            if hot is not None:
+                items = [dict(item.as_dict(), cluster_size=self.hot_index.cluster_size(item)) for item in hot]
+            else:
+                items = self._list_items(INDEX_LIMIT, item_type, collapse=True)
+                sizes = cluster_sizes(
+                    [item["cluster_id"] for item in items],
+                    db_path=self.db_path,
+                    conn=self._read_connection(),
+                )
+                for item in items:
+                    item["cluster_size"] = sizes.get(item["cluster_id"], 1)
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+        return render_page(
+            items,
+            now,
+            search=search,
+            cache=self.fragment_cache,
+            stream_url=stream_url,
+            stream_limit=INDEX_LIMIT,
+        )
+
+    def _is_admin(self) -> bool:
+        if self.admin_token:
+            authorization = self.headers.get("Authorization", "")
+            supplied = authorization[7:] if authorization.startswith("Bearer ") else ""
+            return hmac.compare_digest(supplied.encode("utf-8"), self.admin_token.encode("utf-8"))
+        # A reverse proxy on the same host makes every client look local, so
+        # the exemption needs a loopback-only listener and no forwarding headers.
+        if any(self.headers.get(header) for header in PROXY_HEADERS):
+            return False
+        try:
+            return (
+                ipaddress.ip_address(self.server.server_address[0]).is_loopback
+                and ipaddress.ip_address(self.client_address[0]).is_loopback
+            )
+        except ValueError:
+            return False
+
+    def _handle_debug(self, path: str, query: Dict[str, list]) -> None:
+        if not self._is_admin():
+            self._send_response("Forbidden", status=403, content_type="text/plain")
+            return
+
+        if path == "/debug/profile":
+            try:
+                seconds = float(query.get("seconds", ["5"])[0])
+                interval = float(query.get("interval_ms", [str(DEFAULT_SAMPLE_INTERVAL * 1000)])[0]) / 1000
+            except ValueError as exc:
+                self._send_response(str(exc), status=400, content_type="text/plain")
+                return
+            if not 0 < seconds <= MAX_PROFILE_SECONDS or interval <= 0:
+                self._send_response(
+                    f"seconds must be in (0, {MAX_PROFILE_SECONDS:g}] and interval_ms positive",
+                    status=400,
+                    content_type="text/plain",
+                )
+                return
+            if not _PROFILE_LOCK.acquire(blocking=False):
+                self._send_response("A profile is already running", status=409, content_type="text/plain")
+                return
+            try:
+                stacks = sample_stacks(seconds, interval)
+            finally:
+                _PROFILE_LOCK.release()
+            self._send_response(render_collapsed(stacks), content_type="text/plain")
+            return
+
+        if path == "/debug/requests":
+            if self.request_profiler is None:
+                self._send_response(
+                    "Request profiling is off; start the server with --profile-requests",
+                    status=404,
+                    content_type="text/plain",
+                )
+                return
+            sections = [
+                f"=== {profile.seconds * 1000:.1f} ms  {profile.label}  "
+                f"{datetime.fromtimestamp(profile.started_at, timezone.utc).isoformat()} ===\n{profile.stats}"
+                for profile in self.request_profiler.slowest()
+            ]
+            self._send_response("\n".join(sections) or "No profiles yet\n", content_type="text/plain")
+            return
+
+        self._send_response("Not Found", status=404, content_type="text/plain")
+
     def do_GET(self):  # noqa: N802
         path, query = self._parse_query()
+        self._route = _route_label(path)
+        self._status = 500  # stays 500 if the handler raises before responding
+        self._response_bytes = 0
+        started = time.perf_counter()
+        try:
+            if self.request_profiler is not None and not path.startswith("/debug/"):
+                self.request_profiler.run(f"GET {self.path}", lambda: self._handle_get(path, query))
+            else:
+                self._handle_get(path, query)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=self._route)
+            HTTP_REQUESTS.inc(route=self._route, status=str(self._status))
+            HTTP_RESPONSE_BYTES.observe(self._response_bytes, route=self._route)
+
+    def _handle_get(self, path: str, query: Dict[str, list]) -> None:
+        if path == "/metrics":
+            self._send_response(REGISTRY.render(), content_type="text/plain; version=0.0.4")
+            return
+
+        if path.startswith("/debug/"):
+            self._handle_debug(path, query)
+            return
+
         if path == "/api/items":
-            item_type = query.get("type", [None])[0]
-            limit = int(query.get("limit", ["100"])[0])
-            items = list_items(db_path=self.db_path, limit=limit, item_type=item_type)
-            self._send_response(json.dumps(items), content_type="application/json")
+            filters = {name: query[name][0] for name in ITEM_FILTERS if query.get(name, [""])[0]}
+            collapse = query.get("collapse", ["0"])[0] in ("1", "true")
+            try:
+                limit = int(query.get("limit", ["100"])[0])
+                if "cursor" in filters:
+                    decode_cursor(filters["cursor"])
+            except ValueError as exc:
+                self._send_response(str(exc), status=400, content_type="text/plain")
+                return
+            self._send_cached(
+                ("/api/items", limit, collapse, tuple(sorted(filters.items()))),
+                lambda: self._render_items_page(limit, filters, collapse),
+            )
+            return
+
+        if path.startswith("/api/items/"):
+            # Single item with its full body, loaded from item_bodies on demand.
+            item = get_item(path[len("/api/items/"):], db_path=self.db_path, conn=self._read_connection())
+            if item is None:
+                self._send_response("Not Found", status=404, content_type="text/plain")
+                return
+            self._send_response(json.dumps(item), content_type="application/json")
+            return
+
+        if path == "/api/export":
+            export_format = query.get("format", ["ndjson"])[0]
+            if export_format not in EXPORT_FORMATS:
+                self._send_response(
+                    f"Unknown format; use one of {', '.join(EXPORT_FORMATS)}",
+                    status=400,
+                    content_type="text/plain",
+                )
+                return
+            filters = {
+                name: query[name][0]
+                for name in ITEM_FILTERS
+                if name != "cursor" and query.get(name, [""])[0]
+            }
+            self._send_export(export_format, filters)
+            return
+
+        if path == "/api/search":
+            text = query.get("q", [""])[0].strip()
+            try:
+                limit = int(query.get("limit", ["50"])[0])
+                offset = int(query.get("offset", ["0"])[0])
+            except ValueError as exc:
+                self._send_response(str(exc), status=400, content_type="text/plain")
+                return
+            if not text:
+                self._send_response("Missing q parameter", status=400, content_type="text/plain")
+                return
+            self._send_cached(
+                ("/api/search", text, limit, offset),
+                lambda: self._render_search_page(text, limit, offset),
+            )
+            return
+
+        if path == "/api/top":
+            # Best items per topic, from the item_top summary table.
+            item_type = query.get("type", [""])[0] or None
+            topic = query.get("topic", [""])[0] or None
+            try:
+                limit = int(query.get("limit", [str(DEFAULT_TOP_LIMIT)])[0])
+            except ValueError as exc:
+                self._send_response(str(exc), status=400, content_type="text/plain")
+                return
+            self._send_cached(
+                ("/api/top", item_type, topic, limit),
+                lambda: (
+                    json.dumps(
+                        top_items(
+                            item_type,
+                            per_topic=limit,
+                            topic=topic,
+                            db_path=self.db_path,
+                            conn=self._read_connection(),
+                        )
+                    ),
+                    "application/json",
+                    {},
+                ),
+            )
+            return
+
+        if path == "/api/stream":
+            self._send_event_stream(query)
+            return
+
+        if path == "/api/facets":
+            self._send_cached(
+                ("/api/facets",),
+                lambda: (
+                    json.dumps(facet_counts(db_path=self.db_path, conn=self._read_connection())),
+                    "application/json",
+                    {},
+                ),
+            )
             return
 
         if path == "/":
             item_type = query.get("type", [None])[0]
-            items = list_items(db_path=self.db_path, limit=200, item_type=item_type)
-            now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-            filters = [
-                ("All", None),
-                ("Science", "science"),
-                ("Society", "society"),
-            ]
-            filter_links = " ".join(
-                f'<a class="filter" href="/?type={value}">{label}</a>'
-                if value
-                else '<a class="filter" href="/">All</a>'
-                for label, value in filters
+            search = query.get("q", [""])[0].strip() or None
+            self._send_cached(
+                ("/", item_type, search, INDEX_LIMIT),
+                lambda: (self._render_index(item_type, search), "text/html", {}),
             )
+            return
 
-            rows = []
-            for item in items:
-                summary = item.get("summary") or ""
-                tone = item.get("tone")
-                tone_display = f"{tone:.2f}" if isinstance(tone, (float, int)) else ""
-                rows.append(
-                    f"""
-                    <div class="item">
-                      <div class="meta">
-                        <span class="badge">{item['item_type'].upper()}</span>
-                        <span class="topic">{item['topic']}</span>
-                        <span class="source">{item['source']}</span>
-                        <span class="date">{item.get('published_date') or ""}</span>
-                      </div>
-                      <h3>{item['headline']}</h3>
-                      <p class="summary">{summary}</p>
-                      <div class="links">
-                        <a href="{item.get('url') or '#'}" target="_blank" rel="noreferrer">Open source</a>
-                        <button class="copy" data-copy="{item['headline']} — {summary} {item.get('url') or ''}">Copy</button>
-                        <span class="tone">{tone_display}</span>
-                      </div>
-                    </div>
-                    """
-                )
+        self._send_response("Not Found", status=404, content_type="text/plain")
+
+
+_BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: 5\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Busy\n"
+)
+
+
+class CCPHTTPServer(HTTPServer):
+    """HTTPServer whose handlers can take a connection over (see detach)."""
 
-            html = f"""
-            <!doctype html>
-            <html lang="en">
-              <head>
-                <meta charset="utf-8" />
-                <meta name="viewport" content="width=device-width, initial-scale=1" />
-                <title>Conscious Curation Pipeline</title>
-                <style>
-                  body {{
-                    font-family: "Inter", Arial, sans-serif;
-                    margin: 0;
-                    padding: 24px;
-                    background: #0f172a;
-                    color: #e2e8f0;
-                  }}
-                  header {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: baseline;
-                    flex-wrap: wrap;
-                    gap: 12px;
-                  }}
-                  h1 {{
-                    margin: 0;
-                    font-size: 24px;
-                  }}
-                  .filters {{
-                    display: flex;
-                    gap: 8px;
-                    flex-wrap: wrap;
-                  }}
-                  .filter {{
-                    color: #94a3b8;
-                    text-decoration: none;
-                    border: 1px solid #334155;
-                    padding: 6px 10px;
-                    border-radius: 6px;
-                  }}
-                  .item {{
-                    background: #111827;
-                    border: 1px solid #1f2937;
-                    border-radius: 12px;
-                    padding: 16px;
-                    margin-top: 16px;
-                  }}
-                  .meta {{
-                    font-size: 12px;
-                    text-transform: uppercase;
-                    display: flex;
-                    gap: 8px;
-                    flex-wrap: wrap;
-                  }}
-                  .badge {{
-                    background: #2563eb;
-                    color: white;
-                    padding: 2px 6px;
-                    border-radius: 999px;
-                    font-weight: 600;
-                  }}
-                  .summary {{
-                    color: #cbd5f5;
-                    font-size: 14px;
-                  }}
-                  .links {{
-                    display: flex;
-                    gap: 12px;
-                    align-items: center;
-                    flex-wrap: wrap;
-                  }}
-                  .links a {{
-                    color: #38bdf8;
-                    text-decoration: none;
-                  }}
-                  .copy {{
-                    background: #1d4ed8;
-                    border: none;
-                    color: white;
-                    padding: 6px 12px;
-                    border-radius: 6px;
-                    cursor: pointer;
-                  }}
-                  .tone {{
-                    color: #fbbf24;
-                    font-size: 12px;
-                  }}
-                </style>
-              </head>
-              <body>
-                <header>
-                  <div>
-                    <h1>Conscious Curation Pipeline</h1>
-                    <p>Updated {now}</p>
-                  </div>
-                  <div class="filters">{filter_links}</div>
-                </header>
-                <main>
-                  {''.join(rows) if rows else "<p>No items yet. Run the ingest job.</p>"}
-                </main>
-                <script>
-                  document.querySelectorAll(".copy").forEach((button) => {{
-                    button.addEventListener("click", () => {{
-                      navigator.clipboard.writeText(button.dataset.copy || "");
-                      button.textContent = "Copied!";
-                      setTimeout(() => (button.textContent = "Copy"), 1200);
-                    }});
-                  }});
-                </script>
-              </body>
-            </html>
-            """
-            self._send_response(html)
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._detached: Set[socket.socket] = set()
+        self._detached_lock = threading.Lock()
+
+    def detach(self, request: socket.socket) -> None:
+        """Leave request open after its handler returns; whoever took it over closes it."""
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def shutdown_request(self, request) -> None:
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+
+class PooledHTTPServer(CCPHTTPServer):
+    """
+    HTTPServer that hands each connection to a fixed pool of worker threads.
+
+    At most max_connections connections are accepted at once (being served or
+    waiting for a worker); beyond that clients get an immediate 503 instead of
+    piling up. server_close() drains in-flight requests before returning.
+    """
+
+    def __init__(self, server_address, handler_class, workers: int, max_connections: int) -> None:
+        self.request_queue_size = max_connections
+        super().__init__(server_address, handler_class)
+        self.draining = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ccp-http")
+        self._slots = threading.BoundedSemaphore(max(workers, max_connections))
+        self._active: Set[socket.socket] = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address) -> None:
+        if self.draining or not self._slots.acquire(blocking=False):
+            HTTP_REJECTED.inc()
+            try:
+                request.sendall(_BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
             return
+        with self._active_lock:
+            self._active.add(request)
+        self._pool.submit(self._process_request_worker, request, client_address)
 
-        self._send_response("Not Found", status=404, content_type="text/plain")
+    def _process_request_worker(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._active_lock:
+                self._active.discard(request)
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self) -> None:
+        self.draining = True
+        super().server_close()
+        # Wake idle keep-alive connections blocked on their next request line;
+        # requests already being handled can still write their response.
+        with self._active_lock:
+            active = list(self._active)
+        for request in active:
+            try:
+                request.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        self._pool.shutdown(wait=True)
+
+
+def _install_shutdown_handlers(server: HTTPServer) -> None:
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def handle_signal(signum, frame) -> None:
+        # shutdown() blocks until serve_forever() returns, so it cannot run
+        # on the thread that is inside serve_forever().
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
 
 
-def run_server(host: str, port: int, db_path: str) -> None:
+def run_server(
+    host: str,
+    port: int,
+    db_path: str,
+    workers: int = DEFAULT_WORKERS,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    cache_entries: int = DEFAULT_CACHE_ENTRIES,
+    admin_token: Optional[str] = None,
+    profile_requests: float = 0.0,
+    profile_keep: int = DEFAULT_PROFILE_KEEP,
+    stream_poll: float = DEFAULT_POLL_INTERVAL,
+    max_streams: int = DEFAULT_MAX_SUBSCRIBERS,
+    hot_items: int = 0,
+) -> None:
     init_db(db_path)
     CCPHandler.db_path = db_path
-    server = HTTPServer((host, port), CCPHandler)
-    print(f"Serving CCP web UI on http://{host}:{port}")
-    server.serve_forever()
+    CCPHandler.admin_token = admin_token
+    if profile_requests > 0:
+        CCPHandler.request_profiler = RequestProfiler(profile_requests, profile_keep)
+    CCPHandler.read_connections = ReadConnectionManager(db_path)
+    if cache_entries > 0:
+        CCPHandler.data_version = DataVersionWatcher(db_path)
+        CCPHandler.response_cache = ResponseCache(cache_entries)
+    if hot_items > 0:
+        CCPHandler.hot_index = HotIndex(db_path, CCPHandler.read_connections, hot_items)
+        CCPHandler.hot_index.refresh()
+    if max_streams > 0:
+        CCPHandler.item_stream = ItemStream(
+            db_path,
+            CCPHandler.read_connections,
+            render=render_item,
+            poll_interval=stream_poll,
+            max_subscribers=max_streams,
+        )
+        CCPHandler.item_stream.start()
+    if workers > 0:
+        # Keep-alive needs a worker per open connection, so only enable it when pooled.
+        CCPHandler.protocol_version = "HTTP/1.1"
+        server = PooledHTTPServer((host, port), CCPHandler, workers, max_connections)
+        mode = f"{workers} workers, max {max_connections} connections"
+    else:
+        server = CCPHTTPServer((host, port), CCPHandler)
+        mode = "single-threaded"
+    _install_shutdown_handlers(server)
+    print(f"Serving CCP web UI on http://{host}:{port} ({mode})")
+    try:
+        server.serve_forever()
+    finally:
+        if CCPHandler.item_stream is not None:
+            CCPHandler.item_stream.close()
+        server.server_close()
+        if CCPHandler.hot_index is not None:
+            CCPHandler.hot_index.close()
+        CCPHandler.read_connections.close_all()
+        if CCPHandler.data_version is not None:
+            CCPHandler.data_version.close()
+        print("CCP web UI stopped")
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -202,9 +895,84 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--db-path", default=DEFAULT_DB_PATH, help="Path to the SQLite database.")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind.")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Worker threads serving requests; 0 uses the single-threaded server.",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help="Connections accepted at once in pooled mode; extra clients get 503.",
+    )
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        default=DEFAULT_CACHE_ENTRIES,
+        help="Rendered responses kept until the database changes; 0 disables the cache.",
+    )
+    parser.add_argument(
+        "--admin-token",
+        default=os.environ.get("CCP_ADMIN_TOKEN"),
+        help="Bearer token for /debug/* endpoints (default: $CCP_ADMIN_TOKEN). "
+        "Without one, they are open only to loopback clients when --host is a loopback address.",
+    )
+    parser.add_argument(
+        "--profile-requests",
+        type=float,
+        default=0.0,
+        metavar="FRACTION",
+        help="cProfile this fraction of requests (e.g. 0.01); the slowest are listed at /debug/requests.",
+    )
+    parser.add_argument(
+        "--profile-keep",
+        type=int,
+        default=DEFAULT_PROFILE_KEEP,
+        help="How many of the slowest request profiles to keep (at least 1).",
+    )
+    parser.add_argument(
+        "--stream-poll",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between checks for new items to push to /api/stream subscribers.",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=DEFAULT_MAX_SUBSCRIBERS,
+        help="Open /api/stream connections allowed at once; 0 turns streaming off.",
+    )
+    parser.add_argument(
+        "--hot-items",
+        type=int,
+        nargs="?",
+        const=DEFAULT_HOT_ITEMS,
+        default=0,
+        metavar="N",
+        help=f"Keep the newest N items in memory (off by default; {DEFAULT_HOT_ITEMS} if N is omitted) "
+        "and serve / and /api/items from them; deeper pages still go to SQLite.",
+    )
     return parser
 
 
 if __name__ == "__main__":
-    args = build_parser().parse_args()
-    run_server(args.host, args.port, args.db_path)
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.profile_keep < 1:
+        parser.error("--profile-keep must be at least 1")
+    run_server(
+        args.host,
+        args.port,
+        args.db_path,
+        workers=args.workers,
+        max_connections=args.max_connections,
+        cache_entries=args.cache_entries,
+        admin_token=args.admin_token,
+        profile_requests=args.profile_requests,
+        profile_keep=args.profile_keep,
+        stream_poll=args.stream_poll,
+        max_streams=args.max_streams,
+        hot_items=args.hot_items,
+    )
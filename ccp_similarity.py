@@ -0,0 +1,83 @@
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+SIMHASH_BITS = 64
+# Signatures are split into this many bands for candidate lookup. Two
+# signatures within MAX_HAMMING_DISTANCE bits always share at least one band
+# (pigeonhole), so a band-equality lookup finds every match without comparing
+# against the whole table.
+BAND_COUNT = 4
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+MAX_HAMMING_DISTANCE = BAND_COUNT - 1
+# Headlines with fewer distinct tokens ("Untitled", "No Title") are too short
+# to cluster safely and always stay on their own.
+MIN_TOKENS = 3
+# Only the leading tokens count; a headline never needs more, and it keeps the
+# feature count (unigrams plus bigrams) under the 256 the byte lanes can hold.
+MAX_TOKENS = 64
+
+STOPWORDS = frozenset(
+    """
+    a about after an and are as at be by for from has have in into is it its
+    new of on or over says than that the their this to under up was were will with
+    """.split()
+)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Syndicated copies often append the outlet: "Headline - Reuters", "Headline | BBC News".
+_OUTLET_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+_BIT_LANES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def normalize_tokens(headline: str) -> List[str]:
+    """Lowercased word tokens without outlet suffix, punctuation, stopwords or single characters."""
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(_OUTLET_SUFFIX.sub("", headline).lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash over equally weighted unigram and bigram features."""
+    tokens = tokens[:MAX_TOKENS]
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    # A bit is set when more than half of the feature hashes have it set.
+    # Each hash is spread to one byte per bit so a single big-int sum counts
+    # every bit position at once (exact while there are fewer than 256 features).
+    half = len(features) / 2
+    counts = sum(
+        int.from_bytes(format(_feature_hash(feature), f"0{SIMHASH_BITS}b").encode().translate(_BIT_LANES), "big")
+        for feature in features
+    )
+    return int("".join("1" if count > half else "0" for count in counts.to_bytes(SIMHASH_BITS, "big")), 2)
+
+
+def headline_signature(headline: Optional[str]) -> Optional[int]:
+    tokens = normalize_tokens(headline or "")
+    if len(set(tokens)) < MIN_TOKENS:
+        return None
+    return simhash(tokens)
+
+
+def bands(signature: int) -> Tuple[int, ...]:
+    mask = (1 << BAND_BITS) - 1
+    return tuple(signature >> (index * BAND_BITS) & mask for index in range(BAND_COUNT))
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+def to_signed(signature: int) -> int:
+    """SQLite integers are signed 64-bit; store signatures in that range."""
+    return signature - (1 << SIMHASH_BITS) if signature >= 1 << (SIMHASH_BITS - 1) else signature
+
+
+def from_signed(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
@@ -1,11 +1,39 @@
+import base64
+import html
+import heapq
+import json
+import math
 import os
 import sqlite3
-from datetime import datetime
-from typing import Iterable, Optional, Dict, Any, List
+import threading
+import zlib
+from collections import Counter
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Dict, Any, List, NamedTuple, Tuple
+
+from ccp_metrics import REGISTRY
+from ccp_similarity import (
+    BAND_COUNT,
+    MAX_HAMMING_DISTANCE,
+    bands,
+    from_signed,
+    hamming_distance,
+    headline_signature,
+    to_signed,
+)
 
 
 DEFAULT_DB_PATH = os.environ.get("CCP_DB_PATH", "ccp.db")
 
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "ccp_db_query_seconds",
+    "Time spent in storage calls, by operation.",
+    ("operation",),
+)
+ROWS_WRITTEN = REGISTRY.counter("ccp_db_rows_written_total", "Item rows inserted or refreshed by save_items.")
+
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS items (
@@ -20,68 +48,1363 @@ CREATE TABLE IF NOT EXISTS items (
     tone REAL,
     created_at TEXT NOT NULL
 );
-CREATE INDEX IF NOT EXISTS idx_items_created_at ON items (created_at DESC);
-CREATE INDEX IF NOT EXISTS idx_items_type ON items (item_type);
+CREATE TABLE IF NOT EXISTS query_watermarks (
+    source TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    query TEXT NOT NULL,
+    newest_seen TEXT,
+    last_success_at TEXT NOT NULL,
+    PRIMARY KEY (source, topic, query)
+);
 """
 
+# Near-duplicate index: one SimHash signature per item, split into bands so
+# candidates are found by index lookups (see ccp_similarity).
+_SIMHASH_SCHEMA = (
+    f"""
+    CREATE TABLE IF NOT EXISTS item_simhash (
+        id TEXT PRIMARY KEY,
+        cluster_id TEXT NOT NULL,
+        simhash INTEGER,
+        {", ".join(f"band{index} INTEGER" for index in range(BAND_COUNT))}
+    )
+    """,
+    *(
+        f"CREATE INDEX IF NOT EXISTS idx_item_simhash_band{index} ON item_simhash (band{index})"
+        for index in range(BAND_COUNT)
+    ),
+    "CREATE INDEX IF NOT EXISTS idx_items_cluster ON items (cluster_id)",
+)
+
+
+def _add_item_clusters(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE items ADD COLUMN cluster_id TEXT")
+    conn.execute("UPDATE items SET cluster_id = id")
+    for statement in _SIMHASH_SCHEMA:
+        conn.execute(statement)
+    _assign_clusters(conn, conn.execute("SELECT id, headline FROM items ORDER BY created_at, id").fetchall())
+
+
+# Summaries kept up to date by save_items, so the UI and the dossier never
+# GROUP BY or rank the whole items table: item counts per facet value, and
+# each topic's TOP_ITEMS_PER_TOPIC best items, at most one per near-duplicate
+# cluster (its best-scoring member in that topic).
+_SUMMARY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS item_facets (
+        facet TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (facet, value)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS item_top (
+        topic TEXT NOT NULL,
+        id TEXT NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (topic, id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_item_top_score ON item_top (topic, score DESC)",
+)
+
+
+def _add_summaries(conn: sqlite3.Connection) -> None:
+    for statement in _SUMMARY_SCHEMA:
+        conn.execute(statement)
+    _rebuild_facets(conn)
+    _rebuild_top(conn)
+
+
+def _repick_top(conn: sqlite3.Connection) -> None:
+    _rebuild_top(conn)
+
+
+# Each entry upgrades the schema by one step. init_db applies the ones a
+# database has not seen yet and records progress in PRAGMA user_version.
+MIGRATIONS = (
+    # 1: composite (filter, created_at, id) indexes, so every keyset page of
+    # list_items is an index range scan instead of a filter plus sort.
+    """
+    DROP INDEX IF EXISTS idx_items_created_at;
+    DROP INDEX IF EXISTS idx_items_type;
+    CREATE INDEX IF NOT EXISTS idx_items_created ON items (created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_items_type_created ON items (item_type, created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_items_topic_created ON items (topic, created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_items_source_created ON items (source, created_at DESC, id DESC);
+    """,
+    # 2: full-text index over headline/summary/topic, kept in sync by triggers.
+    # It is an external-content table keyed on items.rowid, so anything that
+    # renumbers rowids (a full VACUUM) needs rebuild_search_index afterwards.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        headline, summary, topic,
+        content = 'items', content_rowid = 'rowid',
+        tokenize = 'porter unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts (rowid, headline, summary, topic)
+        VALUES (new.rowid, new.headline, new.summary, new.topic);
+    END;
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, headline, summary, topic)
+        VALUES ('delete', old.rowid, old.headline, old.summary, old.topic);
+    END;
+    CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF headline, summary, topic ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, headline, summary, topic)
+        VALUES ('delete', old.rowid, old.headline, old.summary, old.topic);
+        INSERT INTO items_fts (rowid, headline, summary, topic)
+        VALUES (new.rowid, new.headline, new.summary, new.topic);
+    END;
+    INSERT INTO items_fts (items_fts) VALUES ('rebuild');
+    """,
+    # 3: near-duplicate clusters (items.cluster_id plus the SimHash index),
+    # backfilled for existing rows in insertion order.
+    _add_item_clusters,
+    # 4: full item text (science abstracts), zlib-compressed and kept out of
+    # items so list queries only touch the short summary snippet.
+    """
+    CREATE TABLE IF NOT EXISTS item_bodies (
+        id TEXT PRIMARY KEY,
+        body BLOB NOT NULL
+    );
+    """,
+    # 5: per-query yield (results per run, smoothed), which the query planner
+    # uses to decide what to fetch first.
+    """
+    ALTER TABLE query_watermarks ADD COLUMN runs INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE query_watermarks ADD COLUMN yield_ema REAL;
+    """,
+    # 6: OpenAlex citation counts, used to rank science items in the dossier.
+    "ALTER TABLE items ADD COLUMN citations INTEGER;",
+    # 7: materialized facet counts and per-topic top items, backfilled.
+    _add_summaries,
+    # 8: a counter bumped by every change to items other than appending new
+    # rows, so in-memory copies know when following the rowid is not enough.
+    """
+    CREATE TABLE IF NOT EXISTS item_epoch (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        epoch INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO item_epoch (id, epoch) VALUES (0, 0);
+    """,
+    # 9: item_top ranks one member per (topic, cluster) instead of only
+    # cluster founders, which left topics of cross-topic clusters unlisted.
+    _repick_top,
+)
+
+# Largest page list_items_page will return.
+MAX_PAGE_SIZE = 1000
+
+
+# Read-side tuning for the long-lived connections handed out by ReadConnectionManager.
+READ_PRAGMAS = (
+    "PRAGMA query_only=ON;",
+    "PRAGMA mmap_size=268435456;",  # 256 MiB
+    "PRAGMA cache_size=-65536;",  # 64 MiB
+)
+# Prepared statements kept per connection; list_items only issues a handful of shapes.
+STATEMENT_CACHE_SIZE = 128
+
 
 def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
     return sqlite3.connect(db_path or DEFAULT_DB_PATH)
 
 
+def _read_only_uri(db_path: str) -> str:
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro"
+
+
+class ReadConnectionManager:
+    """
+    Hands out one read-only connection per thread, opened on first use and
+    reused afterwards, so request handlers skip connection setup and schema
+    parsing.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, pragmas: Iterable[str] = READ_PRAGMAS) -> None:
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        uri = _read_only_uri(self.db_path)
+        # check_same_thread is off only so close_all() can run from another thread;
+        # each connection is still used by the thread that opened it.
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        """Close every connection handed out; call once at shutdown."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
 def init_db(db_path: Optional[str] = None) -> None:
-    with get_connection(db_path) as conn:
+    with closing(sqlite3.connect(db_path or DEFAULT_DB_PATH, isolation_level=None)) as conn:
+        # Only takes effect on a new, empty database; compact_db converts older ones.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
         conn.executescript(SCHEMA)
+        _migrate(conn)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Apply pending MIGRATIONS (SQL scripts or callables), each in its own transaction."""
+    version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        if isinstance(step, str):
+            conn.executescript(f"BEGIN; {step} PRAGMA user_version = {number}; COMMIT;")
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+# Rows per executemany() call; the whole save is still one transaction.
+DEFAULT_WRITE_BATCH_SIZE = 1000
+
+ITEM_COLUMNS = (
+    "id",
+    "item_type",
+    "topic",
+    "headline",
+    "source",
+    "published_date",
+    "summary",
+    "url",
+    "tone",
+    "citations",
+    "created_at",
+    "cluster_id",
+)
+_HEADLINE_INDEX = ITEM_COLUMNS.index("headline")
+_TOPIC_INDEX = ITEM_COLUMNS.index("topic")
+_CLUSTER_INDEX = ITEM_COLUMNS.index("cluster_id")
+
+_INSERT_SQL = f"""
+    INSERT OR IGNORE INTO items ({", ".join(ITEM_COLUMNS)})
+    VALUES ({", ".join("?" for _ in ITEM_COLUMNS)})
+"""
+
+# Refresh the mutable fields of an existing row. The WHERE clause skips no-op
+# updates so they are not counted as changes.
+_UPSERT_SQL = f"""
+    INSERT INTO items ({", ".join(ITEM_COLUMNS)})
+    VALUES ({", ".join("?" for _ in ITEM_COLUMNS)})
+    ON CONFLICT (id) DO UPDATE SET
+        summary = excluded.summary,
+        tone = excluded.tone,
+        citations = excluded.citations
+    WHERE items.summary IS NOT excluded.summary
+        OR items.tone IS NOT excluded.tone
+        OR items.citations IS NOT excluded.citations
+"""
+
+
+def get_write_connection(db_path: Optional[str] = None, check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Autocommit connection for save_items; write PRAGMAs are applied once here.
+    Pass check_same_thread=False to share it between threads that serialize
+    their writes.
+    """
+    conn = sqlite3.connect(db_path or DEFAULT_DB_PATH, isolation_level=None, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+
+def _item_values(item: Dict[str, Any]) -> tuple:
+    return (
+        item["id"],
+        item["item_type"],
+        item["topic"],
+        item["headline"],
+        item["source"],
+        item.get("published_date"),
+        item.get("summary"),
+        item.get("url"),
+        item.get("tone"),
+        item.get("citations"),
+        item.get("created_at") or datetime.utcnow().isoformat(),
+        # Every item starts as its own cluster; _assign_clusters may merge it.
+        item["id"],
+    )
+
+
+_INSERT_BODY_SQL = "INSERT OR IGNORE INTO item_bodies (id, body) VALUES (?, ?)"
+_UPSERT_BODY_SQL = """
+    INSERT INTO item_bodies (id, body) VALUES (?, ?)
+    ON CONFLICT (id) DO UPDATE SET body = excluded.body
+"""
+
+
+def compress_body(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 9)
+
+
+def decompress_body(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _chunked(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk: List[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_BAND_COLUMNS = ", ".join(f"band{index}" for index in range(BAND_COUNT))
+_CANDIDATES_SQL = f"""
+    SELECT cluster_id, simhash FROM item_simhash
+    WHERE {" OR ".join(f"band{index} = ?" for index in range(BAND_COUNT))}
+    ORDER BY rowid
+"""
+_INSERT_SIMHASH_SQL = f"""
+    INSERT INTO item_simhash (id, cluster_id, simhash, {_BAND_COLUMNS})
+    VALUES (?, ?, ?, {", ".join("?" for _ in range(BAND_COUNT))})
+"""
+
+
+def _assign_clusters(conn: sqlite3.Connection, rows: Iterable[Tuple[str, str]]) -> None:
+    """
+    Index each new (id, headline) and join it to the closest earlier
+    near-duplicate, looking in the SimHash table and among rows of this call.
+    """
+    pending: Dict[Tuple[int, int], List[Tuple[str, int]]] = {}
+    simhash_rows = []
+    moves = []
+    for item_id, headline in rows:
+        signature = headline_signature(headline)
+        cluster_id = item_id
+        signature_bands: Tuple[Optional[int], ...] = (None,) * BAND_COUNT
+        if signature is not None:
+            signature_bands = bands(signature)
+            candidates = [
+                (stored_cluster, from_signed(stored))
+                for stored_cluster, stored in conn.execute(_CANDIDATES_SQL, signature_bands)
+            ]
+            for band in enumerate(signature_bands):
+                candidates.extend(pending.get(band, ()))
+            best_distance = MAX_HAMMING_DISTANCE + 1
+            for candidate_cluster, candidate in candidates:
+                distance = hamming_distance(signature, candidate)
+                if distance < best_distance:
+                    cluster_id, best_distance = candidate_cluster, distance
+            for band in enumerate(signature_bands):
+                pending.setdefault(band, []).append((cluster_id, signature))
+        simhash_rows.append(
+            (item_id, cluster_id, None if signature is None else to_signed(signature), *signature_bands)
+        )
+        if cluster_id != item_id:
+            moves.append((cluster_id, item_id))
+    conn.executemany(_INSERT_SIMHASH_SQL, simhash_rows)
+    conn.executemany("UPDATE items SET cluster_id = ? WHERE id = ?", moves)
+
+
+def _bump_epoch(conn: sqlite3.Connection) -> None:
+    conn.execute("UPDATE item_epoch SET epoch = epoch + 1")
+
+
+def item_epoch(conn: sqlite3.Connection) -> int:
+    """Changes so far to existing items (updates, deletes, reclustering, renumbering rowids)."""
+    return conn.execute("SELECT epoch FROM item_epoch").fetchone()[0]
+
+
+def _new_rows(conn: sqlite3.Connection, chunk: List[tuple]) -> List[tuple]:
+    """Rows of chunk that were just inserted, i.e. not yet in the SimHash index."""
+    known = {
+        row[0]
+        for row in conn.execute(
+            "SELECT id FROM item_simhash WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([row[0] for row in chunk]),),
+        )
+    }
+    fresh = []
+    for row in chunk:
+        if row[0] not in known:
+            known.add(row[0])
+            fresh.append(row)
+    return fresh
+
+
+def rebuild_clusters(db_path: Optional[str] = None) -> int:
+    """Recompute every near-duplicate cluster from scratch; returns the number of clusters."""
+    init_db(db_path)
+    with closing(get_write_connection(db_path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM item_simhash")
+            conn.execute("UPDATE items SET cluster_id = id")
+            _assign_clusters(conn, conn.execute("SELECT id, headline FROM items ORDER BY created_at, id").fetchall())
+            # Cluster representatives may have changed.
+            _rebuild_top(conn)
+            _bump_epoch(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return conn.execute("SELECT count(DISTINCT cluster_id) FROM items").fetchone()[0]
+
+
+@DB_QUERY_SECONDS.time(operation="cluster_sizes")
+def cluster_sizes(
+    cluster_ids: Iterable[str],
+    db_path: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, int]:
+    query = """
+        SELECT cluster_id, count(*) FROM items
+        WHERE cluster_id IN (SELECT value FROM json_each(?))
+        GROUP BY cluster_id
+    """
+    params = (json.dumps(list(cluster_ids)),)
+    if conn is not None:
+        return {row[0]: row[1] for row in conn.execute(query, params)}
+    with closing(get_connection(db_path)) as conn:
+        return {row[0]: row[1] for row in conn.execute(query, params)}
+
+
+@DB_QUERY_SECONDS.time(operation="save_items")
+def save_items(
+    items: Iterable[Dict[str, Any]],
+    db_path: Optional[str] = None,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    upsert: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Write items in a single transaction and return the number of rows changed.
+
+    Existing ids are ignored, or with upsert=True have their summary, tone
+    and citations refreshed (refreshed rows count towards the total). An item's optional
+    "body" (full text) goes compressed into item_bodies. New items are folded
+    into near-duplicate clusters, and item_facets/item_top are brought up to
+    date in the same transaction. Pass a connection from get_write_connection
+    to reuse it across calls.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = get_write_connection(db_path)
+    sql = _UPSERT_SQL if upsert else _INSERT_SQL
+    body_sql = _UPSERT_BODY_SQL if upsert else _INSERT_BODY_SQL
+    try:
+        changed = 0
+        refreshed = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for batch in _chunked(items, batch_size):
+                chunk = [_item_values(item) for item in batch]
+                # rowcount sums sqlite3_changes() over the batch, which unlike
+                # total_changes leaves out rows written by the FTS triggers.
+                chunk_changed = conn.executemany(sql, chunk).rowcount
+                changed += chunk_changed
+                conn.executemany(
+                    body_sql,
+                    [(item["id"], compress_body(item["body"])) for item in batch if item.get("body")],
+                )
+                fresh = _new_rows(conn, chunk)
+                refreshed += chunk_changed - len(fresh)
+                _assign_clusters(conn, [(row[0], row[_HEADLINE_INDEX]) for row in fresh])
+                _count_facets(conn, fresh)
+                # An upsert can change the score of rows that already existed.
+                _update_top(conn, [row[0] for row in (chunk if upsert else fresh)])
+            if refreshed:
+                _bump_epoch(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        ROWS_WRITTEN.inc(changed)
+        return changed
+    finally:
+        if owns_conn:
+            conn.close()
+
+
+def _refound_clusters(conn: sqlite3.Connection, cluster_ids: Iterable[str]) -> List[str]:
+    """
+    Clusters whose founding item is gone get their oldest remaining member as
+    founder, so collapsed lists and new near-duplicates still find them.
+    Returns the new founders' ids.
+    """
+    members: Dict[str, List[str]] = {}
+    for cluster_id, item_id in conn.execute(
+        """
+        SELECT cluster_id, id FROM items
+        WHERE cluster_id IN (SELECT value FROM json_each(?))
+        ORDER BY created_at, id
+        """,
+        (json.dumps(sorted(set(cluster_ids))),),
+    ):
+        members.setdefault(cluster_id, []).append(item_id)
+    founders = []
+    for cluster_id, item_ids in members.items():
+        if cluster_id in item_ids:
+            continue
+        ids = json.dumps(item_ids)
+        conn.execute("UPDATE items SET cluster_id = ? WHERE id IN (SELECT value FROM json_each(?))", (item_ids[0], ids))
+        conn.execute(
+            "UPDATE item_simhash SET cluster_id = ? WHERE id IN (SELECT value FROM json_each(?))", (item_ids[0], ids)
+        )
+        founders.append(item_ids[0])
+    return founders
+
+
+@DB_QUERY_SECONDS.time(operation="delete_items")
+def delete_items(
+    item_ids: Iterable[str],
+    db_path: Optional[str] = None,
+    batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    conn: Optional[sqlite3.Connection] = None,
+) -> int:
+    """
+    Delete items, with their bodies and SimHash entries, in a single
+    transaction and return the number deleted. Clusters that lose their
+    founder get a new one, and item_facets/item_top stay consistent.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = get_write_connection(db_path)
+    try:
+        deleted = 0
+        depleted: set = set()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for chunk in _chunked(item_ids, batch_size):
+                ids = json.dumps(chunk)
+                rows = conn.execute(
+                    f"SELECT {', '.join(ITEM_COLUMNS)} FROM items WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids,),
+                ).fetchall()
+                depleted.update(
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT DISTINCT topic FROM item_top WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+                    )
+                )
+                for table in ("items", "item_bodies", "item_simhash", "item_top"):
+                    conn.execute(f"DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+                deleted += len(rows)
+                _count_facets(conn, rows, sign=-1)
+                _update_top(conn, _refound_clusters(conn, [row[_CLUSTER_INDEX] for row in rows]))
+            # Topics that lost a listed item refill from the rest of their items.
+            if depleted:
+                _rebuild_top(conn, depleted)
+            if deleted:
+                _bump_epoch(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return deleted
+    finally:
+        if owns_conn:
+            conn.close()
+
+
+class SpaceReport(NamedTuple):
+    db_bytes: int
+    wal_bytes: int
+    page_size: int
+    free_pages: int
+    # Bytes per table and index (dbstat); empty if SQLite was built without it.
+    tables: Dict[str, int]
+
+    @property
+    def total_bytes(self) -> int:
+        return self.db_bytes + self.wal_bytes
+
+
+def space_report(db_path: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> SpaceReport:
+    db_path = db_path or DEFAULT_DB_PATH
+    if conn is None:
+        with closing(get_connection(db_path)) as conn:
+            return space_report(db_path, conn)
+    try:
+        tables = dict(conn.execute("SELECT name, sum(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC"))
+    except sqlite3.OperationalError:
+        tables = {}
+    wal_path = db_path + "-wal"
+    return SpaceReport(
+        os.path.getsize(db_path),
+        os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        conn.execute("PRAGMA page_size;").fetchone()[0],
+        conn.execute("PRAGMA freelist_count;").fetchone()[0],
+        tables,
+    )
+
+
+def compact_db(db_path: Optional[str] = None, full: bool = False) -> Tuple[SpaceReport, SpaceReport]:
+    """
+    Hand free pages back to the filesystem (incremental vacuum), checkpoint
+    and truncate the WAL, and return the space report before and after.
+
+    A database created before auto_vacuum=INCREMENTAL was the default, or any
+    call with full=True, gets a full VACUUM instead. That rewrites the whole
+    file (briefly needing as much free disk again) and can renumber rowids,
+    so the full-text index is rebuilt after it.
+    """
+    init_db(db_path)
+    before = space_report(db_path)
+    with closing(get_write_connection(db_path)) as conn:
+        if full or conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            conn.execute("VACUUM;")
+            conn.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild');")
+            conn.execute("BEGIN IMMEDIATE")
+            _bump_epoch(conn)
+            conn.execute("COMMIT")
+        else:
+            # Frees one page per step, and execute() only steps a statement
+            # without result columns once; executescript runs it to completion.
+            conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA optimize;")
+        # Waits up to the busy timeout for readers on older snapshots; if they
+        # outlast it the WAL is checkpointed as far as possible but not truncated.
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchall()
+    return before, space_report(db_path)
+
+
+class DataVersionWatcher:
+    """
+    Cheap change detector for caches. PRAGMA data_version changes whenever
+    another connection commits, but its value is only comparable on the same
+    connection, so all callers share this one.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self._conn = sqlite3.connect(_read_only_uri(db_path or DEFAULT_DB_PATH), uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version;").fetchone()[0]
 
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
-def save_items(items: Iterable[Dict[str, Any]], db_path: Optional[str] = None) -> int:
-    inserted = 0
+
+def max_item_rowid(db_path: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Highest items rowid (0 when empty); new rows are numbered above it."""
+    query = "SELECT coalesce(max(rowid), 0) FROM items"
+    if conn is not None:
+        return conn.execute(query).fetchone()[0]
+    with closing(get_connection(db_path)) as conn:
+        return conn.execute(query).fetchone()[0]
+
+
+def newest_item_rows(limit: int, conn: sqlite3.Connection) -> List[tuple]:
+    """The limit newest items in list_items order, as (rowid, *ITEM_COLUMNS) tuples."""
+    return conn.execute(
+        f"SELECT rowid, {', '.join(ITEM_COLUMNS)} FROM items ORDER BY created_at DESC, id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def item_rows_after(rowid: int, limit: int, conn: sqlite3.Connection) -> List[tuple]:
+    """Up to limit items inserted after rowid, oldest first, as (rowid, *ITEM_COLUMNS) tuples."""
+    return conn.execute(
+        f"SELECT rowid, {', '.join(ITEM_COLUMNS)} FROM items WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (rowid, limit),
+    ).fetchall()
+
+
+def latest_created_at(db_path: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> Optional[str]:
+    query = "SELECT max(created_at) FROM items"
+    if conn is not None:
+        return conn.execute(query).fetchone()[0]
+    with closing(get_connection(db_path)) as conn:
+        return conn.execute(query).fetchone()[0]
+
+
+_WATERMARK_COLUMNS = "source, topic, query, newest_seen, last_success_at, runs, yield_ema"
+
+
+def get_watermark(source: str, topic: str, query: str, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
     with get_connection(db_path) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA synchronous=NORMAL;")
-        for item in items:
-            values = (
-                item["id"],
-                item["item_type"],
-                item["topic"],
-                item["headline"],
-                item["source"],
-                item.get("published_date"),
-                item.get("summary"),
-                item.get("url"),
-                item.get("tone"),
-                item.get("created_at") or datetime.utcnow().isoformat(),
-            )
-            cursor = conn.execute(
-                """
-                INSERT OR IGNORE INTO items
-                (id, item_type, topic, headline, source, published_date, summary, url, tone, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                values,
-            )
-            if cursor.rowcount == 1:
-                inserted += 1
-    return inserted
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            f"""
+            SELECT {_WATERMARK_COLUMNS}
+            FROM query_watermarks
+            WHERE source = ? AND topic = ? AND query = ?
+            """,
+            (source, topic, query),
+        ).fetchone()
+        return dict(row) if row else None
 
 
+def list_watermarks(db_path: Optional[str] = None) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """Every watermark row, keyed by (source, topic, query)."""
+    with get_connection(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f"SELECT {_WATERMARK_COLUMNS} FROM query_watermarks").fetchall()
+    return {(row["source"], row["topic"], row["query"]): dict(row) for row in rows}
+
+
+# Weight of the latest run in a query's smoothed yield.
+YIELD_SMOOTHING = 0.3
+
+_UPDATE_WATERMARK_SQL = """
+INSERT INTO query_watermarks (source, topic, query, newest_seen, last_success_at, runs, yield_ema)
+VALUES (:source, :topic, :query, :newest_seen, :now, :matched IS NOT NULL, :matched)
+ON CONFLICT (source, topic, query) DO UPDATE SET
+    newest_seen = CASE
+        WHEN query_watermarks.newest_seen IS NULL THEN excluded.newest_seen
+        WHEN excluded.newest_seen IS NULL THEN query_watermarks.newest_seen
+        ELSE max(query_watermarks.newest_seen, excluded.newest_seen)
+    END,
+    last_success_at = excluded.last_success_at,
+    runs = query_watermarks.runs + excluded.runs,
+    yield_ema = CASE
+        WHEN excluded.yield_ema IS NULL THEN query_watermarks.yield_ema
+        WHEN query_watermarks.yield_ema IS NULL THEN excluded.yield_ema
+        ELSE query_watermarks.yield_ema + :smoothing * (excluded.yield_ema - query_watermarks.yield_ema)
+    END
+"""
+
+
+def update_watermark(
+    source: str,
+    topic: str,
+    query: str,
+    newest_seen: Optional[str],
+    db_path: Optional[str] = None,
+    matched: Optional[int] = None,
+) -> None:
+    """
+    Record a successful run; newest_seen only ever moves forward. matched, the
+    number of results the run found for this query, feeds its smoothed yield.
+    """
+    update_watermarks([(source, topic, query, newest_seen, matched)], db_path)
+
+
+def update_watermarks(
+    runs: Iterable[Tuple[str, str, str, Optional[str], Optional[int]]],
+    db_path: Optional[str] = None,
+) -> None:
+    """update_watermark for many (source, topic, query, newest_seen, matched) runs in one transaction."""
+    now = datetime.utcnow().isoformat()
+    with get_connection(db_path) as conn:
+        conn.executemany(
+            _UPDATE_WATERMARK_SQL,
+            [
+                {
+                    "source": source,
+                    "topic": topic,
+                    "query": query,
+                    "newest_seen": newest_seen,
+                    "matched": matched,
+                    "now": now,
+                    "smoothing": YIELD_SMOOTHING,
+                }
+                for source, topic, query, newest_seen, matched in runs
+            ],
+        )
+
+
+def encode_cursor(item: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past item in created_at DESC, id DESC order."""
+    payload = json.dumps([item["created_at"], item["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(created_at, str) or not isinstance(item_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, item_id
+
+
+def _items_query(
+    item_type: Optional[str] = None,
+    topic: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    collapse: bool = False,
+) -> Tuple[str, List[Any]]:
+    query = f"""
+        SELECT {", ".join(ITEM_COLUMNS)}
+        FROM items
+    """
+    filters = []
+    filter_params: List[Any] = []
+    for column, value in (("item_type", item_type), ("topic", topic), ("source", source)):
+        if value:
+            filters.append(f"{{table}}.{column} = ?")
+            filter_params.append(value)
+    if since:
+        filters.append("{table}.created_at >= ?")
+        filter_params.append(since)
+    if until:
+        filters.append("{table}.created_at < ?")
+        filter_params.append(until)
+    clauses = [clause.format(table="items") for clause in filters]
+    params: List[Any] = list(filter_params)
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    if collapse and not filters:
+        # One representative per near-duplicate cluster: the item that founded it.
+        clauses.append("id = cluster_id")
+    elif collapse:
+        # Clusters span topics, types and sources, so the founder may be filtered
+        # out; represent each cluster by its best member that passes the filters:
+        # the founder, else the oldest.
+        clauses.append(
+            f"""NOT EXISTS (
+                SELECT 1 FROM items AS other
+                WHERE other.cluster_id = items.cluster_id
+                AND {" AND ".join(clause.format(table="other") for clause in filters)}
+                AND (other.id != other.cluster_id, other.created_at, other.id)
+                    < (items.id != items.cluster_id, items.created_at, items.id)
+            )"""
+        )
+        params.extend(filter_params)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY created_at DESC, id DESC"
+    return query, params
+
+
+@DB_QUERY_SECONDS.time(operation="list_items")
 def list_items(
     db_path: Optional[str] = None,
     limit: int = 100,
     item_type: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    topic: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    collapse: bool = False,
 ) -> List[Dict[str, Any]]:
-    query = """
-        SELECT id, item_type, topic, headline, source, published_date, summary, url, tone, created_at
-        FROM items
     """
-    params = []
-    if item_type:
-        query += " WHERE item_type = ?"
-        params.append(item_type)
-    query += " ORDER BY created_at DESC LIMIT ?"
+    Newest items first. since/until bound created_at (inclusive/exclusive) and
+    cursor continues after the page that produced it (see list_items_page).
+    collapse=True keeps one item per near-duplicate cluster.
+    """
+    query, params = _items_query(item_type, topic, source, since, until, cursor, collapse)
+    query += " LIMIT ?"
     params.append(limit)
 
-    with get_connection(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute(query, params).fetchall()
-        return [dict(row) for row in rows]
+    if conn is not None:
+        return _fetch_dicts(conn, query, params)
+    with closing(get_connection(db_path)) as conn:
+        return _fetch_dicts(conn, query, params)
+
+
+@DB_QUERY_SECONDS.time(operation="get_item")
+def get_item(
+    item_id: str,
+    db_path: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Optional[Dict[str, Any]]:
+    """One item with its full "body" (None if it has none), or None if the id is unknown."""
+    if conn is not None:
+        return _get_item(conn, item_id)
+    with closing(get_connection(db_path)) as conn:
+        return _get_item(conn, item_id)
+
+
+def _get_item(conn: sqlite3.Connection, item_id: str) -> Optional[Dict[str, Any]]:
+    items = _fetch_dicts(conn, f"SELECT {', '.join(ITEM_COLUMNS)} FROM items WHERE id = ?", (item_id,))
+    if not items:
+        return None
+    item = items[0]
+    row = conn.execute("SELECT body FROM item_bodies WHERE id = ?", (item_id,)).fetchone()
+    item["body"] = decompress_body(row[0]) if row else None
+    return item
+
+
+def get_bodies(item_ids: Iterable[str], conn: sqlite3.Connection) -> Dict[str, str]:
+    """Full text of those item_ids that have one, keyed by id."""
+    return {
+        item_id: decompress_body(blob)
+        for item_id, blob in conn.execute(
+            "SELECT id, body FROM item_bodies WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(item_ids)),),
+        )
+    }
+
+
+def iter_item_rows(
+    conn: sqlite3.Connection,
+    fetch_size: int = 500,
+    **filters: Any,
+) -> Iterator[tuple]:
+    """
+    Stream every matching item as a tuple in ITEM_COLUMNS order, newest first.
+    Rows are pulled fetch_size at a time, so memory does not grow with the table.
+    """
+    query, params = _items_query(**filters)
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def list_items_page(limit: int = 100, **filters: Any) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """list_items plus the cursor of the following page, or None on the last page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    items = list_items(limit=limit + 1, **filters)
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1])
+
+
+# Ranking for the dossier and /api/top: science items by citations, society
+# items by how negative their GDELT tone is, decaying by half every
+# RANKING_HALF_LIFE_DAYS of age. Exponential decay keeps the order of two
+# items fixed as time passes, so scores can be computed once, at write time:
+# log2(base) + published day / half-life.
+RANKING_HALF_LIFE_DAYS = {"science": 30.0, "society": 2.0}
+# GDELT tone rarely leaves [-10, 10]; anything above this adds nothing.
+TONE_CEILING = 10.0
+# Items kept per topic in item_top; the most /api/top and the dossier can list.
+TOP_ITEMS_PER_TOPIC = 50
+FACETS = ("item_type", "topic", "source")
+
+_FACET_INDEXES = tuple(ITEM_COLUMNS.index(facet) for facet in FACETS)
+_RANKING_COLUMNS = "id, topic, cluster_id, item_type, citations, tone, published_date, created_at"
+
+
+def _published_day(value: Optional[str]) -> Optional[date]:
+    # published_date is YYYY-MM-DD for OpenAlex and YYYYMMDD for GDELT.
+    if not value:
+        return None
+    digits = value[:10].replace("-", "")
+    try:
+        return date(int(digits[:4]), int(digits[4:6]), int(digits[6:8]))
+    except ValueError:
+        return None
+
+
+def ranking_score(
+    item_type: str,
+    citations: Optional[int],
+    tone: Optional[float],
+    published_date: Optional[str],
+    created_at: Optional[str] = None,
+) -> float:
+    if item_type == "science":
+        base = 1.0 + max(citations or 0, 0)
+    else:
+        base = 1.0 + max(TONE_CEILING - (tone or 0.0), 0.0)
+    day = _published_day(published_date) or _published_day(created_at) or date.today()
+    return math.log2(base) + day.toordinal() / RANKING_HALF_LIFE_DAYS.get(item_type, 1.0)
+
+
+def _ranked_rows(rows: Iterable[tuple]) -> Iterator[Tuple[str, str, str, float]]:
+    """(topic, cluster_id, id, score) for rows of _RANKING_COLUMNS."""
+    for item_id, topic, cluster_id, item_type, citations, tone, published_date, created_at in rows:
+        yield topic, cluster_id, item_id, ranking_score(item_type, citations, tone, published_date, created_at)
+
+
+def _cluster_picks(ranked: Iterable[Tuple[str, str, str, float]]) -> Dict[Tuple[str, str], Tuple[float, str]]:
+    """The (score, id) that represents each (topic, cluster_id): its best-scoring member."""
+    picks: Dict[Tuple[str, str], Tuple[float, str]] = {}
+    for topic, cluster_id, item_id, score in ranked:
+        entry = (score, item_id)
+        current = picks.get((topic, cluster_id))
+        if current is None or entry > current:
+            picks[topic, cluster_id] = entry
+    return picks
+
+
+def _count_facets(conn: sqlite3.Connection, rows: List[tuple], sign: int = 1) -> None:
+    """Add (or with sign=-1, remove) rows in ITEM_COLUMNS order to item_facets."""
+    counts = Counter(
+        (facet, row[index]) for row in rows for facet, index in zip(FACETS, _FACET_INDEXES) if row[index] is not None
+    )
+    conn.executemany(
+        """
+        INSERT INTO item_facets (facet, value, count) VALUES (?, ?, ?)
+        ON CONFLICT (facet, value) DO UPDATE SET count = count + excluded.count
+        """,
+        [(facet, value, sign * count) for (facet, value), count in counts.items()],
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM item_facets WHERE count <= 0")
+
+
+def _update_top(conn: sqlite3.Connection, item_ids: List[str]) -> None:
+    """Re-pick the (topic, cluster) groups of the given new or changed items in their topics' top lists."""
+    groups = set(
+        conn.execute(
+            "SELECT topic, cluster_id FROM items WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(item_ids),),
+        )
+    )
+    if not groups:
+        return
+    clusters = json.dumps(sorted({cluster_id for _, cluster_id in groups}))
+    picks = {
+        group: pick
+        for group, pick in _cluster_picks(
+            _ranked_rows(
+                conn.execute(
+                    f"SELECT {_RANKING_COLUMNS} FROM items WHERE cluster_id IN (SELECT value FROM json_each(?))",
+                    (clusters,),
+                )
+            )
+        ).items()
+        if group in groups
+    }
+    listed = [
+        row
+        for row in conn.execute(
+            """
+            SELECT item_top.topic, items.cluster_id, item_top.id, item_top.score
+            FROM item_top JOIN items ON items.id = item_top.id
+            WHERE items.cluster_id IN (SELECT value FROM json_each(?))
+            """,
+            (clusters,),
+        )
+        if (row[0], row[1]) in groups
+    ]
+    # Listed rows that are no longer their group's pick come out. If a group's
+    # pick now scores below what was listed for it, an unlisted item may belong
+    # in the top list instead, so that topic is rebuilt from items.
+    stale = []
+    depleted = set()
+    for topic, cluster_id, item_id, score in listed:
+        pick_score, pick_id = picks[topic, cluster_id]
+        if pick_id != item_id:
+            stale.append((topic, item_id))
+        if pick_score < score:
+            depleted.add(topic)
+    conn.executemany("DELETE FROM item_top WHERE topic = ? AND id = ?", stale)
+    shown = {(topic, item_id) for topic, _, item_id, _ in listed}
+    topics = sorted({topic for topic, _ in groups} - depleted)
+    # item_top is trimmed to TOP_ITEMS_PER_TOPIC, so min(score) is the bar to clear once a topic is full.
+    bars = {
+        topic: (count, lowest)
+        for topic, count, lowest in conn.execute(
+            """
+            SELECT topic, count(*), min(score) FROM item_top
+            WHERE topic IN (SELECT value FROM json_each(?))
+            GROUP BY topic
+            """,
+            (json.dumps(topics),),
+        )
+    }
+    entries = []
+    for (topic, _), (score, item_id) in picks.items():
+        if topic in depleted:
+            continue
+        count, lowest = bars.get(topic, (0, None))
+        if (topic, item_id) in shown or count < TOP_ITEMS_PER_TOPIC or score > lowest:
+            entries.append((topic, item_id, score))
+    conn.executemany(
+        """
+        INSERT INTO item_top (topic, id, score) VALUES (?, ?, ?)
+        ON CONFLICT (topic, id) DO UPDATE SET score = excluded.score
+        """,
+        entries,
+    )
+    for topic in {topic for topic, _, _ in entries}:
+        conn.execute(
+            """
+            DELETE FROM item_top WHERE topic = ? AND id NOT IN (
+                SELECT id FROM item_top WHERE topic = ? ORDER BY score DESC LIMIT ?
+            )
+            """,
+            (topic, topic, TOP_ITEMS_PER_TOPIC),
+        )
+    if depleted:
+        _rebuild_top(conn, depleted)
+
+
+def _rebuild_facets(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM item_facets")
+    for facet in FACETS:
+        conn.execute(
+            f"""
+            INSERT INTO item_facets (facet, value, count)
+            SELECT ?, {facet}, count(*) FROM items WHERE {facet} IS NOT NULL GROUP BY {facet}
+            """,
+            (facet,),
+        )
+
+
+def _rebuild_top(conn: sqlite3.Connection, topics: Optional[Iterable[str]] = None) -> None:
+    """Recompute item_top from items, for every topic or just the given ones."""
+    query = f"SELECT {_RANKING_COLUMNS} FROM items"
+    params: tuple = ()
+    if topics is None:
+        conn.execute("DELETE FROM item_top")
+    else:
+        topics = json.dumps(sorted(set(topics)))
+        conn.execute("DELETE FROM item_top WHERE topic IN (SELECT value FROM json_each(?))", (topics,))
+        query += " WHERE topic IN (SELECT value FROM json_each(?))"
+        params = (topics,)
+    best: Dict[str, List[Tuple[float, str]]] = {}
+    for (topic, _), (score, item_id) in _cluster_picks(_ranked_rows(conn.execute(query, params))).items():
+        heap = best.setdefault(topic, [])
+        if len(heap) < TOP_ITEMS_PER_TOPIC:
+            heapq.heappush(heap, (score, item_id))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, item_id))
+    conn.executemany(
+        "INSERT INTO item_top (topic, id, score) VALUES (?, ?, ?)",
+        [(topic, item_id, score) for topic, heap in best.items() for score, item_id in heap],
+    )
+
+
+def rebuild_summaries(db_path: Optional[str] = None) -> Tuple[int, int]:
+    """Recompute item_facets and item_top from scratch; returns (facet values, topics)."""
+    init_db(db_path)
+    with closing(get_write_connection(db_path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _rebuild_facets(conn)
+            _rebuild_top(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return (
+            conn.execute("SELECT count(*) FROM item_facets").fetchone()[0],
+            conn.execute("SELECT count(DISTINCT topic) FROM item_top").fetchone()[0],
+        )
+
+
+@DB_QUERY_SECONDS.time(operation="facet_counts")
+def facet_counts(
+    db_path: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, Dict[str, int]]:
+    """Item counts per value of each facet (item_type, topic, source), largest first."""
+    query = "SELECT facet, value, count FROM item_facets ORDER BY facet, count DESC, value"
+    if conn is None:
+        with closing(get_connection(db_path)) as conn:
+            rows = conn.execute(query).fetchall()
+    else:
+        rows = conn.execute(query).fetchall()
+    counts: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+    for facet, value, count in rows:
+        counts.setdefault(facet, {})[value] = count
+    return counts
+
+
+@DB_QUERY_SECONDS.time(operation="top_items")
+def top_items(
+    item_type: Optional[str] = None,
+    per_topic: int = 1,
+    window_days: Optional[int] = None,
+    as_of: Optional[datetime] = None,
+    topic: Optional[str] = None,
+    db_path: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    The best per_topic (at most TOP_ITEMS_PER_TOPIC) items of each topic,
+    best first, keyed by topic, read from item_top. Each near-duplicate
+    cluster contributes at most its best member in the topic; with window_days, only items
+    published in the window_days before as_of (ranked from items when
+    item_top's cut leaves a topic short). Each item carries its "score".
+    """
+    clauses = []
+    params: Dict[str, Any] = {"per_topic": max(1, min(per_topic, TOP_ITEMS_PER_TOPIC))}
+    if item_type:
+        clauses.append("items.item_type = :item_type")
+        params["item_type"] = item_type
+    if topic:
+        clauses.append("item_top.topic = :topic")
+        params["topic"] = topic
+    window_start = None
+    if window_days is not None:
+        window_start = ((as_of or datetime.utcnow()) - timedelta(days=window_days)).date()
+    query = f"""
+        SELECT {", ".join(f"items.{column}" for column in ITEM_COLUMNS)}, item_top.score
+        FROM item_top
+        JOIN items ON items.id = item_top.id
+        {"WHERE " + " AND ".join(clauses) if clauses else ""}
+        ORDER BY item_top.topic, item_top.score DESC
+    """
+
+    def read(conn: sqlite3.Connection) -> Dict[str, List[Dict[str, Any]]]:
+        ranked: Dict[str, List[Dict[str, Any]]] = {}
+        listed: Counter = Counter()
+        for row in _fetch_dicts(conn, query, params):
+            listed[row["topic"]] += 1
+            if window_start is not None:
+                day = _published_day(row["published_date"])
+                if day is not None and day < window_start:
+                    continue
+            best = ranked.setdefault(row["topic"], [])
+            if len(best) < params["per_topic"]:
+                best.append(row)
+        if window_start is not None:
+            # item_top only keeps each topic's all-time best; once that list is
+            # full, in-window items below the cut are ranked from items instead.
+            short = [
+                name
+                for name, count in listed.items()
+                if count >= TOP_ITEMS_PER_TOPIC and len(ranked.get(name, [])) < params["per_topic"]
+            ]
+            if short:
+                ranked.update(_top_in_window(conn, short, item_type, window_start, params["per_topic"]))
+        return ranked
+
+    if conn is not None:
+        return read(conn)
+    with closing(get_connection(db_path)) as conn:
+        return read(conn)
+
+
+def _top_in_window(
+    conn: sqlite3.Connection,
+    topics: List[str],
+    item_type: Optional[str],
+    window_start: date,
+    per_topic: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """top_items for the given topics, ranking their in-window items directly."""
+    query = f"""
+        SELECT {", ".join(ITEM_COLUMNS)} FROM items
+        WHERE topic IN (SELECT value FROM json_each(:topics))
+        {"AND item_type = :item_type" if item_type else ""}
+    """
+    picks: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in _fetch_dicts(conn, query, {"topics": json.dumps(topics), "item_type": item_type}):
+        day = _published_day(row["published_date"])
+        if day is not None and day < window_start:
+            continue
+        row["score"] = ranking_score(
+            row["item_type"], row["citations"], row["tone"], row["published_date"], row["created_at"]
+        )
+        group = (row["topic"], row["cluster_id"])
+        current = picks.get(group)
+        if current is None or (row["score"], row["id"]) > (current["score"], current["id"]):
+            picks[group] = row
+    candidates: Dict[str, List[Dict[str, Any]]] = {}
+    for row in picks.values():
+        candidates.setdefault(row["topic"], []).append(row)
+    return {
+        topic: heapq.nlargest(per_topic, rows, key=lambda row: row["score"])
+        for topic, rows in candidates.items()
+    }
+
+
+# Column weights for bm25(): a hit in the headline outranks one in the summary or topic.
+SEARCH_WEIGHTS = (10.0, 3.0, 1.0)
+# Markers placed around matches by highlight()/snippet(); swapped for <mark>
+# only after the text has been HTML-escaped.
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, syntax is never interpreted."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+def _mark_matches(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    escaped = html.escape(text, quote=False)
+    return escaped.replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+
+@DB_QUERY_SECONDS.time(operation="search_items")
+def search_items(
+    text: str,
+    db_path: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Rank items matching every word of text with bm25. Returns (items, has_more).
+    Each item also carries HTML-safe headline_highlight and summary_snippet
+    fields with matches wrapped in <mark>.
+    """
+    match = _fts_query(text)
+    if not match:
+        return [], False
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = f"""
+        SELECT items.id, items.item_type, items.topic, items.headline, items.source,
+               items.published_date, items.summary, items.url, items.tone, items.citations,
+               items.created_at,
+               highlight(items_fts, 0, ?, ?) AS headline_highlight,
+               snippet(items_fts, 1, ?, ?, '…', 32) AS summary_snippet,
+               bm25(items_fts, {", ".join(str(weight) for weight in SEARCH_WEIGHTS)}) AS rank
+        FROM items_fts
+        JOIN items ON items.rowid = items_fts.rowid
+        WHERE items_fts MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    """
+    params = (_MATCH_START, _MATCH_END, _MATCH_START, _MATCH_END, match, limit + 1, max(0, offset))
+    if conn is not None:
+        rows = _fetch_dicts(conn, query, params)
+    else:
+        with closing(get_connection(db_path)) as conn:
+            rows = _fetch_dicts(conn, query, params)
+    for row in rows:
+        row["headline_highlight"] = _mark_matches(row["headline_highlight"])
+        row["summary_snippet"] = _mark_matches(row["summary_snippet"])
+    return rows[:limit], len(rows) > limit
+
+
+def rebuild_search_index(db_path: Optional[str] = None) -> int:
+    """Repopulate items_fts from items; returns the number of rows indexed."""
+    init_db(db_path)
+    with closing(get_write_connection(db_path)) as conn:
+        conn.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild');")
+        return conn.execute("SELECT count(*) FROM items").fetchone()[0]
+
+
+def _fetch_dicts(conn: sqlite3.Connection, query: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+    cursor = conn.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,239 @@
+import json
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ccp_metrics import REGISTRY
+from ccp_storage import ITEM_COLUMNS, DataVersionWatcher, ReadConnectionManager, item_rows_after, max_item_rowid
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_MAX_SUBSCRIBERS = 256
+# Idle subscribers get a comment line this often, so proxies keep the
+# connection open and clients that went away are noticed.
+HEARTBEAT_SECONDS = 15.0
+# A subscriber whose socket will not take an event within this many seconds
+# is dropped; its EventSource reconnects and resumes from Last-Event-ID.
+SEND_TIMEOUT = 2.0
+# More new items than this, in one commit or behind a resuming client, are
+# not replayed one by one: the subscriber gets a reset event instead.
+REPLAY_LIMIT = 1000
+# How long browsers wait before reconnecting.
+RETRY_MILLISECONDS = 3000
+
+STREAM_EVENTS = REGISTRY.counter("ccp_stream_events_total", "Item events written to /api/stream subscribers.")
+STREAM_DISCONNECTS = REGISTRY.counter(
+    "ccp_stream_disconnects_total",
+    "/api/stream subscribers dropped by the server, by reason.",
+    ("reason",),
+)
+
+_HEARTBEAT = b": keep-alive\n\n"
+
+Item = Dict[str, object]
+
+
+def _items_after(rowid: int, limit: int, conn: sqlite3.Connection) -> List[Tuple[int, Item]]:
+    return [(row[0], dict(zip(ITEM_COLUMNS, row[1:]))) for row in item_rows_after(rowid, limit, conn)]
+
+
+def _reset_event(rowid: int, reason: str) -> bytes:
+    # Carries an id so a reconnecting EventSource resumes from here instead of asking again.
+    return f"id: {rowid}\nevent: reset\ndata: {json.dumps({'reason': reason})}\n\n".encode("utf-8")
+
+
+class _Subscriber:
+    def __init__(self, sock: socket.socket, after: Optional[int], item_type: Optional[str], html: bool) -> None:
+        self.sock = sock
+        # Rowid of the last item this subscriber has been sent (or skipped past).
+        self.last = after
+        self.item_type = item_type
+        self.html = html
+
+    def wants(self, item: Item) -> bool:
+        return self.item_type is None or item["item_type"] == self.item_type
+
+
+class ItemStream:
+    """
+    Pushes newly inserted items to /api/stream subscribers.
+
+    A single poller thread serves every subscriber. It checks PRAGMA
+    data_version every poll_interval seconds, which costs no read while
+    nothing has been committed, then reads the items above its rowid
+    high-water mark, encodes each event once and writes it to every
+    subscriber. Subscribers are sockets handed over by the request handler,
+    so an open stream does not hold a server worker.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        connections: ReadConnectionManager,
+        render: Optional[Callable[[Item], str]] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_subscribers: int = DEFAULT_MAX_SUBSCRIBERS,
+    ) -> None:
+        self.render = render
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self._connections = connections
+        self._version = DataVersionWatcher(db_path)
+        self._mark: Optional[int] = None
+        self._subscribers: List[_Subscriber] = []
+        self._pending: List[_Subscriber] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ccp-stream", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._version.close()
+
+    def accepting(self) -> bool:
+        with self._lock:
+            return not self._stop.is_set() and len(self._subscribers) + len(self._pending) < self.max_subscribers
+
+    def subscribe(
+        self,
+        sock: socket.socket,
+        after: Optional[int] = None,
+        item_type: Optional[str] = None,
+        html: bool = False,
+    ) -> bool:
+        """
+        Take over sock, whose response headers have been sent, and stream
+        items inserted after rowid after (default: from now on) to it.
+        Returns False, leaving sock to the caller, if the stream is full.
+        """
+        if not self.accepting():
+            return False
+        sock.settimeout(SEND_TIMEOUT)
+        with self._lock:
+            self._pending.append(_Subscriber(sock, after, item_type, html))
+        self._wake.set()
+        return True
+
+    def _run(self) -> None:
+        conn = self._connections.get()
+        version = None
+        heartbeat_at = time.monotonic() + HEARTBEAT_SECONDS
+        try:
+            while not self._stop.is_set():
+                try:
+                    current = self._version.current()
+                    if current != version:
+                        version = current
+                        self._publish(conn)
+                    self._admit(conn)
+                except sqlite3.Error as exc:
+                    print(f"Item stream poll failed: {exc}")
+                if time.monotonic() >= heartbeat_at:
+                    heartbeat_at = time.monotonic() + HEARTBEAT_SECONDS
+                    for subscriber in list(self._subscribers):
+                        self._send(subscriber, _HEARTBEAT)
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            with self._lock:
+                subscribers = self._subscribers + self._pending
+                self._subscribers, self._pending = [], []
+            for subscriber in subscribers:
+                self._drop(subscriber, "shutdown")
+
+    def _encode(self, cache: Dict[Tuple[int, bool], bytes], rowid: int, item: Item, html: bool) -> bytes:
+        event = cache.get((rowid, html))
+        if event is None:
+            payload = dict(item, html=self.render(item)) if html and self.render else item
+            event = f"id: {rowid}\nevent: item\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+            cache[(rowid, html)] = event
+        return event
+
+    def _deliver(self, subscriber: _Subscriber, rows: List[Tuple[int, Item]], cache: Dict) -> None:
+        events = [
+            self._encode(cache, rowid, item, subscriber.html)
+            for rowid, item in rows
+            if rowid > subscriber.last and subscriber.wants(item)
+        ]
+        if events and self._send(subscriber, b"".join(events)):
+            STREAM_EVENTS.inc(len(events))
+
+    def _publish(self, conn: sqlite3.Connection) -> None:
+        """Send everything committed since the last look to the subscribers that are caught up."""
+        newest = max_item_rowid(conn=conn)
+        mark, self._mark = self._mark, newest
+        if mark is None:
+            return
+        if newest < mark:
+            # Rowids went backwards (the newest items were deleted, or a full
+            # VACUUM renumbered them), so ids clients hold no longer line up.
+            self._reset_all("renumbered")
+            return
+        rows = _items_after(mark, REPLAY_LIMIT + 1, conn) if newest > mark else []
+        if len(rows) > REPLAY_LIMIT:
+            self._reset_all("burst")
+            return
+        if rows:
+            self._mark = rows[-1][0]
+        cache: Dict[Tuple[int, bool], bytes] = {}
+        for subscriber in list(self._subscribers):
+            self._deliver(subscriber, rows, cache)
+            subscriber.last = self._mark
+
+    def _admit(self, conn: sqlite3.Connection) -> None:
+        """Catch new subscribers up from their Last-Event-ID, then add them to the broadcast."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if self._mark is None:
+            self._mark = max_item_rowid(conn=conn)
+        for subscriber in pending:
+            if subscriber.last is None or subscriber.last == self._mark:
+                subscriber.last = self._mark
+            elif subscriber.last > self._mark:
+                if not self._reset(subscriber, "unknown id"):
+                    continue
+            else:
+                rows = [row for row in _items_after(subscriber.last, REPLAY_LIMIT + 1, conn) if row[0] <= self._mark]
+                if len(rows) > REPLAY_LIMIT:
+                    if not self._reset(subscriber, "behind"):
+                        continue
+                else:
+                    self._deliver(subscriber, rows, {})
+                    subscriber.last = self._mark
+            with self._lock:
+                self._subscribers.append(subscriber)
+
+    def _reset(self, subscriber: _Subscriber, reason: str) -> bool:
+        subscriber.last = self._mark
+        return self._send(subscriber, _reset_event(self._mark, reason))
+
+    def _reset_all(self, reason: str) -> None:
+        for subscriber in list(self._subscribers):
+            self._reset(subscriber, reason)
+
+    def _send(self, subscriber: _Subscriber, data: bytes) -> bool:
+        try:
+            subscriber.sock.sendall(data)
+            return True
+        except OSError:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+            self._drop(subscriber, "write failed")
+            return False
+
+    @staticmethod
+    def _drop(subscriber: _Subscriber, reason: str) -> None:
+        STREAM_DISCONNECTS.inc(reason=reason)
+        try:
+            subscriber.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        subscriber.sock.close()